@@ -0,0 +1,266 @@
+"""
+Cache assíncrono compartilhado
+Namespaces com TTL e tamanho máximo (LRU), carregamento single-flight (misses concorrentes
+da mesma chave fazem um único fetch), invalidação por tags e métricas de hit/miss.
+Backends: memória do processo (padrão), Redis (pacote redis, opcional) ou um substituto
+local do Redis que serializa os valores como o store externo faria, para testes.
+Com vários workers e backend em memória, uma invalidação só vale para o worker que a
+recebeu: os TTLs desses namespaces precisam tolerar essa defasagem
+"""
+import asyncio
+import logging
+import math
+import pickle
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = Counter('cache_requests_total', 'Leituras do cache por resultado (hit, miss, coalesced)', ['namespace', 'result'])
+CACHE_EVICTIONS = Counter('cache_evictions_total', 'Entradas removidas por LRU ou expiração', ['namespace', 'reason'])
+CACHE_INVALIDATIONS = Counter('cache_invalidations_total', 'Entradas invalidadas por chave ou tag', ['namespace'])
+CACHE_ENTRIES = Gauge('cache_entries', 'Entradas no cache em memória', ['namespace'])
+
+class _Entry:
+    __slots__ = ('value', 'expires_at', 'tags')
+
+    def __init__(self, value: Any, expires_at: float, tags: Tuple[str, ...]):
+        self.value = value
+        self.expires_at = expires_at
+        self.tags = tags
+
+class MemoryBackend:
+    """LRU por namespace na memória do processo; os valores são devolvidos sem cópia"""
+
+    def __init__(self):
+        self.entries: Dict[str, OrderedDict] = {}
+        self.tags: Dict[str, Dict[str, Set[str]]] = {}
+
+    def _encode(self, value: Any) -> Any:
+        return value
+
+    def _decode(self, value: Any) -> Any:
+        return value
+
+    def _remove(self, namespace: str, key: str) -> bool:
+        entry = self.entries.get(namespace, {}).pop(key, None)
+        if entry is None:
+            return False
+        tag_index = self.tags.get(namespace, {})
+        for tag in entry.tags:
+            keys = tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del tag_index[tag]
+        CACHE_ENTRIES.set(len(self.entries[namespace]), namespace)
+        return True
+
+    async def get(self, namespace: str, key: str) -> Tuple[bool, Any]:
+        entries = self.entries.get(namespace)
+        entry = entries.get(key) if entries else None
+        if entry is None:
+            return False, None
+        if entry.expires_at <= time.monotonic():
+            self._remove(namespace, key)
+            CACHE_EVICTIONS.inc(namespace, 'expired')
+            return False, None
+        entries.move_to_end(key)
+        return True, self._decode(entry.value)
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: float, max_size: int, tags: Tuple[str, ...]):
+        entries = self.entries.setdefault(namespace, OrderedDict())
+        if key in entries:
+            self._remove(namespace, key)
+        entries[key] = _Entry(self._encode(value), time.monotonic() + ttl, tags)
+        tag_index = self.tags.setdefault(namespace, {})
+        for tag in tags:
+            tag_index.setdefault(tag, set()).add(key)
+        while len(entries) > max_size:
+            oldest = next(iter(entries))
+            self._remove(namespace, oldest)
+            CACHE_EVICTIONS.inc(namespace, 'lru')
+        CACHE_ENTRIES.set(len(entries), namespace)
+
+    async def delete(self, namespace: str, key: str) -> int:
+        return int(self._remove(namespace, key))
+
+    async def invalidate_tags(self, namespace: str, tags: Iterable[str]) -> int:
+        removed = 0
+        for tag in tags:
+            for key in list(self.tags.get(namespace, {}).get(tag, ())):
+                removed += self._remove(namespace, key)
+        return removed
+
+    async def clear(self, namespace: str) -> int:
+        count = len(self.entries.get(namespace, ()))
+        self.entries.pop(namespace, None)
+        self.tags.pop(namespace, None)
+        CACHE_ENTRIES.set(0, namespace)
+        return count
+
+class LocalSharedBackend(MemoryBackend):
+    """Substituto local do store externo: guarda os valores serializados, como o Redis"""
+
+    def _encode(self, value: Any) -> Any:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _decode(self, value: Any) -> Any:
+        return pickle.loads(value)
+
+class RedisBackend:
+    """
+    Store compartilhado entre workers/instâncias. O limite de tamanho fica a cargo da
+    política de memória do Redis (maxmemory-policy allkeys-lru); tags são sets de chaves
+    """
+
+    def __init__(self, url: str, prefix: str = 'watizat:cache'):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f'{self.prefix}:{namespace}:{key}'
+
+    def _tag_key(self, namespace: str, tag: str) -> str:
+        return f'{self.prefix}:{namespace}:#tag:{tag}'
+
+    async def get(self, namespace: str, key: str) -> Tuple[bool, Any]:
+        raw = await self.client.get(self._key(namespace, key))
+        if raw is None:
+            return False, None
+        return True, pickle.loads(raw)
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: float, max_size: int, tags: Tuple[str, ...]):
+        full_key = self._key(namespace, key)
+        seconds = max(1, math.ceil(ttl))
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(full_key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ex=seconds)
+            for tag in tags:
+                tag_key = self._tag_key(namespace, tag)
+                pipe.sadd(tag_key, full_key)
+                pipe.expire(tag_key, seconds)
+            await pipe.execute()
+
+    async def delete(self, namespace: str, key: str) -> int:
+        return await self.client.delete(self._key(namespace, key))
+
+    async def invalidate_tags(self, namespace: str, tags: Iterable[str]) -> int:
+        removed = 0
+        for tag in tags:
+            tag_key = self._tag_key(namespace, tag)
+            keys = await self.client.smembers(tag_key)
+            if keys:
+                removed += await self.client.delete(*keys)
+            await self.client.delete(tag_key)
+        return removed
+
+    async def clear(self, namespace: str) -> int:
+        removed = 0
+        async for key in self.client.scan_iter(match=f'{self.prefix}:{namespace}:*', count=500):
+            removed += await self.client.delete(key)
+        return removed
+
+def backend_from_env(name: str, redis_url: Optional[str] = None):
+    if name == 'memory':
+        return MemoryBackend()
+    if name == 'local':
+        return LocalSharedBackend()
+    if name == 'redis':
+        if not redis_url:
+            raise RuntimeError("CACHE_BACKEND=redis requires CACHE_REDIS_URL")
+        return RedisBackend(redis_url)
+    raise RuntimeError(f"Unknown cache backend: {name}")
+
+class CacheNamespace:
+    def __init__(self, name: str, backend, ttl: float, max_size: int):
+        self.name = name
+        self.backend = backend
+        self.ttl = ttl
+        self.max_size = max_size
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._inflight_tags: Dict[str, Tuple[str, ...]] = {}
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        found, value = await self.backend.get(self.name, key)
+        CACHE_REQUESTS.inc(self.name, 'hit' if found else 'miss')
+        return found, value
+
+    async def set(self, key: str, value: Any, tags: Iterable[str] = ()):
+        await self.backend.set(self.name, key, value, self.ttl, self.max_size, tuple(tags))
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]], tags: Iterable[str] = ()) -> Any:
+        """
+        Valor em cache ou carregado por loader(); misses concorrentes da chave esperam o mesmo fetch.
+        O fetch roda numa task própria: cancelar quem o iniciou não cancela os outros que esperam.
+        Uma invalidação da chave durante o fetch o desliga de _inflight: o resultado (talvez
+        anterior à escrita) volta para quem já esperava, mas não é gravado no cache
+        """
+        found, value = await self.backend.get(self.name, key)
+        if found:
+            CACHE_REQUESTS.inc(self.name, 'hit')
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            CACHE_REQUESTS.inc(self.name, 'coalesced')
+        else:
+            CACHE_REQUESTS.inc(self.name, 'miss')
+            tags = tuple(tags)
+            task = asyncio.ensure_future(self._load(key, loader, tags))
+            self._inflight[key] = task
+            self._inflight_tags[key] = tags
+            task.add_done_callback(lambda done: self._load_finished(key, done))
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]], tags: Iterable[str]) -> Any:
+        value = await loader()
+        if self._inflight.get(key) is asyncio.current_task():
+            await self.set(key, value, tags)
+        return value
+
+    def _load_finished(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            self._forget(key)
+        if not task.cancelled():
+            # Evita o aviso de exceção nunca lida quando ninguém mais esperava
+            task.exception()
+
+    def _forget(self, key: str):
+        self._inflight.pop(key, None)
+        self._inflight_tags.pop(key, None)
+
+    async def delete(self, key: str):
+        # Antes de apagar: um fetch em andamento não grava depois da invalidação
+        self._forget(key)
+        removed = await self.backend.delete(self.name, key)
+        CACHE_INVALIDATIONS.inc(self.name, amount=removed)
+
+    async def invalidate_tags(self, *tags: str):
+        for key, key_tags in list(self._inflight_tags.items()):
+            if set(key_tags) & set(tags):
+                self._forget(key)
+        removed = await self.backend.invalidate_tags(self.name, tags)
+        CACHE_INVALIDATIONS.inc(self.name, amount=removed)
+
+    async def clear(self):
+        self._inflight.clear()
+        self._inflight_tags.clear()
+        removed = await self.backend.clear(self.name)
+        CACHE_INVALIDATIONS.inc(self.name, amount=removed)
+
+class Cache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.namespaces: Dict[str, CacheNamespace] = {}
+
+    def namespace(self, name: str, ttl: float, max_size: int = 1000) -> CacheNamespace:
+        namespace = CacheNamespace(name, self.backend, ttl, max_size)
+        self.namespaces[name] = namespace
+        return namespace
@@ -0,0 +1,261 @@
+"""
+Permissões de chat baseadas em bitmasks de categorias
+Cada usuário guarda suas categorias de ajuda/necessidade (incluindo as dos seus
+posts 'need') como bitmask, mantida a cada escrita; a checagem vira um AND bit a bit.
+Cada escrita também publica os usuários afetados em db.meta (versions.publish_change);
+os outros workers descartam essas entradas e as recarregam do banco no próximo uso
+"""
+import asyncio
+import itertools
+import logging
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, Optional
+
+from versions import fetch_changes, publish_change
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ['food', 'legal', 'health', 'housing', 'work', 'education', 'social', 'clothes', 'furniture', 'transport']
+
+USER_PROJECTION = {'_id': 0, 'id': 1, 'role': 1, 'help_categories': 1, 'need_categories': 1}
+
+CHAT_PERMISSIONS_VERSION_ID = 'chat_permissions_version'
+
+class CategoryBits:
+    """
+    Um bit fixo para cada categoria conhecida. Categorias desconhecidas (o cliente manda
+    texto livre) não ganham bit: não casam com nada e não fazem o mapa crescer
+    """
+
+    def __init__(self, categories: Iterable[str] = CATEGORIES):
+        self.names = list(categories)
+        self.bits: Dict[str, int] = {category: 1 << index for index, category in enumerate(self.names)}
+
+    def bit(self, category: str) -> int:
+        return self.bits.get(category, 0)
+
+    def mask(self, categories: Iterable[str]) -> int:
+        mask = 0
+        for category in categories or []:
+            mask |= self.bit(category)
+        return mask
+
+    def first(self, mask: int) -> Optional[str]:
+        """Nome da categoria do bit menos significativo"""
+        if not mask:
+            return None
+        return self.names[(mask & -mask).bit_length() - 1]
+
+class UserMasks:
+    __slots__ = ('role', 'help_mask', 'has_help', 'need_mask', 'need_categories',
+                 'post_counts', 'post_total', 'post_mask', 'version')
+
+    def __init__(self, role: str, help_categories: Optional[list], need_categories: Optional[list],
+                 bits: CategoryBits, version: int):
+        self.role = role
+        self.help_mask = bits.mask(help_categories)
+        # Listas não vazias, mesmo só com categorias desconhecidas, contam como "definidas"
+        self.has_help = bool(help_categories)
+        self.need_mask = bits.mask(need_categories)
+        # Ordem do próprio migrante: matching_category é a primeira compatível nela
+        self.need_categories = tuple(need_categories or ())
+        # bit -> número de posts 'need'; a ordem de inserção é a do primeiro post de cada categoria
+        self.post_counts = Counter()
+        self.post_total = 0  # todos os posts 'need', inclusive sem categoria conhecida
+        self.post_mask = 0
+        self.version = version
+
+    def recompute_post_mask(self):
+        mask = 0
+        for bit, count in self.post_counts.items():
+            if count > 0:
+                mask |= bit
+        self.post_mask = mask
+
+class ChatPermissionIndex:
+    def __init__(self, pair_cache_size: int = 50000):
+        self.categories = CategoryBits()
+        self.users: Dict[str, UserMasks] = {}
+        self.pair_cache: OrderedDict = OrderedDict()
+        self.pair_cache_size = pair_cache_size
+        # Versões globais e crescentes: uma entrada recriada nunca reaproveita resultado antigo
+        self._versions = itertools.count(1)
+        self.loaded = False
+        self.version = 0  # última versão de db.meta já aplicada neste processo
+
+    async def load(self, db):
+        """Reconstrói todas as bitmasks a partir de users e dos posts 'need'"""
+        # Versão lida antes: mudanças feitas durante a carga são reaplicadas pelo sync
+        version, _ = await fetch_changes(db, CHAT_PERMISSIONS_VERSION_ID, 0)
+        users = {}
+        async for doc in db.users.find({}, USER_PROJECTION).batch_size(1000):
+            users[doc['id']] = self._masks_from_doc(doc)
+        pipeline = [
+            {'$match': {'type': 'need'}},
+            {'$group': {
+                '_id': {'user_id': '$user_id', 'category': '$category'},
+                'count': {'$sum': 1},
+                'first_at': {'$min': '$created_at'}
+            }}
+        ]
+        rows = [row async for row in db.posts.aggregate(pipeline)]
+        # Mesma ordem que os posts teriam numa leitura sem sort (primeiro post de cada categoria)
+        rows.sort(key=lambda row: row.get('first_at') or '')
+        for row in rows:
+            entry = users.get(row['_id']['user_id'])
+            if entry:
+                self._add_posts(entry, row['_id'].get('category'), row['count'])
+        for entry in users.values():
+            entry.recompute_post_mask()
+        self.users = users
+        self.pair_cache.clear()
+        self.loaded = True
+        self.version = version
+        logger.info(f"Chat permission index loaded with {len(users)} users")
+
+    async def refresh_forever(self, db, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.load(db)
+            except Exception as e:
+                logger.error(f"Chat permission index refresh failed: {str(e)}")
+
+    async def publish(self, db, user_ids: Iterable[str]):
+        """Avisa os outros workers que as entradas desses usuários mudaram"""
+        try:
+            await publish_change(db, CHAT_PERMISSIONS_VERSION_ID, set(user_ids))
+        except Exception as e:
+            # A escrita já foi feita: os outros workers só se corrigem no refresh completo
+            logger.error(f"Chat permission change publish failed: {str(e)}")
+
+    async def sync(self, db):
+        """Descarta as entradas alteradas por outros workers desde a última versão vista"""
+        version, user_ids = await fetch_changes(db, CHAT_PERMISSIONS_VERSION_ID, self.version)
+        if version == self.version:
+            return
+        if user_ids is None:
+            await self.load(db)
+            return
+        for user_id in user_ids:
+            # Recarregada do banco pelo ensure(); versão nova invalida o pair cache
+            self.users.pop(user_id, None)
+        self.version = version
+
+    async def ensure(self, db, user_id: str, load_user=None) -> Optional[UserMasks]:
+        """
+        Entrada do usuário, carregando do banco se ainda não estiver no índice.
+        load_user(user_id) permite reaproveitar um loader que já tem o documento
+        """
+        entry = self.users.get(user_id)
+        if entry is not None:
+            return entry
+        if load_user is not None:
+            doc = await load_user(user_id)
+        else:
+            doc = await db.users.find_one({'id': user_id}, USER_PROJECTION)
+        if not doc:
+            return None
+        entry = self._masks_from_doc(doc)
+        async for post in db.posts.find({'user_id': user_id, 'type': 'need'}, {'_id': 0, 'category': 1}):
+            self._add_posts(entry, post.get('category'), 1)
+        entry.recompute_post_mask()
+        # Pode ter sido inserido por outra corrotina enquanto esperávamos o banco
+        return self.users.setdefault(user_id, entry)
+
+    def _masks_from_doc(self, doc: dict) -> UserMasks:
+        return UserMasks(
+            doc.get('role'),
+            doc.get('help_categories'),
+            doc.get('need_categories'),
+            self.categories,
+            next(self._versions)
+        )
+
+    def _add_posts(self, entry: UserMasks, category: Optional[str], count: int):
+        entry.post_total += count
+        bit = self.categories.bit(category)
+        if bit:
+            entry.post_counts[bit] += count
+
+    def upsert_user(self, doc: dict):
+        entry = self.users.get(doc['id'])
+        fresh = self._masks_from_doc(doc)
+        if entry is None:
+            self.users[doc['id']] = fresh
+            return
+        entry.role = fresh.role
+        entry.help_mask = fresh.help_mask
+        entry.has_help = fresh.has_help
+        entry.need_mask = fresh.need_mask
+        entry.need_categories = fresh.need_categories
+        entry.version = fresh.version
+
+    def remove_user(self, user_id: str):
+        self.users.pop(user_id, None)
+
+    def add_need_post(self, user_id: str, category: str):
+        self._change_post_count(user_id, category, 1)
+
+    def remove_need_post(self, user_id: str, category: str):
+        self._change_post_count(user_id, category, -1)
+
+    def _change_post_count(self, user_id: str, category: Optional[str], delta: int):
+        entry = self.users.get(user_id)
+        if entry is None:
+            return
+        entry.post_total = max(0, entry.post_total + delta)
+        bit = self.categories.bit(category)
+        if bit:
+            count = entry.post_counts[bit] + delta
+            if count > 0:
+                entry.post_counts[bit] = count
+            else:
+                # Um post novo dessa categoria volta para o fim da ordem, como no banco
+                entry.post_counts.pop(bit, None)
+        entry.recompute_post_mask()
+        entry.version = next(self._versions)
+
+    def can_chat(self, current_id: str, current: UserMasks, other_id: str, other: UserMasks) -> dict:
+        key = (current_id, other_id)
+        versions = (current.version, other.version)
+        cached = self.pair_cache.get(key)
+        if cached is not None and cached[0] == versions:
+            self.pair_cache.move_to_end(key)
+            return cached[1]
+
+        result = self._evaluate(current, other)
+        self.pair_cache[key] = (versions, result)
+        if len(self.pair_cache) > self.pair_cache_size:
+            self.pair_cache.popitem(last=False)
+        return result
+
+    def _evaluate(self, current: UserMasks, other: UserMasks) -> dict:
+        # Migrantes podem conversar com qualquer voluntário ou helper
+        if current.role == 'migrant':
+            return {'can_chat': True, 'reason': 'allowed'}
+
+        if current.role in ['volunteer', 'helper'] and other.role == 'migrant':
+            if not current.has_help:
+                # Se não definiu categorias, permitir chat (legacy)
+                return {'can_chat': True, 'reason': 'no_categories_defined'}
+
+            if other.need_mask & current.help_mask:
+                # Primeira categoria compatível na ordem das need_categories do migrante
+                for category in other.need_categories:
+                    if self.categories.bit(category) & current.help_mask:
+                        return {'can_chat': True, 'reason': 'category_match', 'matching_category': category}
+
+            if not other.need_categories and not other.post_total:
+                return {'can_chat': True, 'reason': 'no_needs_defined'}
+
+            if other.post_mask & current.help_mask:
+                # Categoria do post mais antigo que for compatível
+                for bit, count in other.post_counts.items():
+                    if count > 0 and bit & current.help_mask:
+                        return {'can_chat': True, 'reason': 'category_match', 'matching_category': self.categories.first(bit)}
+
+            return {'can_chat': False, 'reason': 'no_matching_categories'}
+
+        # Outros casos: permitir
+        return {'can_chat': True, 'reason': 'allowed'}
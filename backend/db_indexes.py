@@ -0,0 +1,46 @@
+"""
+Índices do MongoDB criados na inicialização do servidor
+create_indexes é idempotente: índices já existentes não são recriados
+"""
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, IndexModel
+
+# Cada campo de lista (help_categories, languages, professional_specialties) tem seu próprio
+# índice composto: o Mongo não indexa dois arrays no mesmo índice
+VOLUNTEER_DIRECTORY_SORT = [('created_at', DESCENDING), ('id', DESCENDING)]
+
+INDEXES = {
+    'users': [
+        IndexModel([('id', ASCENDING)]),
+        IndexModel([('email', ASCENDING)]),
+        IndexModel([('role', ASCENDING)] + VOLUNTEER_DIRECTORY_SORT),
+        IndexModel([('role', ASCENDING), ('professional_area', ASCENDING)] + VOLUNTEER_DIRECTORY_SORT),
+        IndexModel([('role', ASCENDING), ('help_categories', ASCENDING)] + VOLUNTEER_DIRECTORY_SORT),
+        IndexModel([('role', ASCENDING), ('languages', ASCENDING)] + VOLUNTEER_DIRECTORY_SORT),
+        IndexModel([('role', ASCENDING), ('professional_specialties', ASCENDING)] + VOLUNTEER_DIRECTORY_SORT),
+        IndexModel([('role', ASCENDING), ('location.lat', ASCENDING), ('location.lng', ASCENDING)]),
+    ],
+    # 'geo' é o ponto GeoJSON derivado de 'location' (ver geo.to_point e migrate_geo.py)
+    'services': [
+        IndexModel([('geo', GEOSPHERE), ('category', ASCENDING)]),
+        # Chave natural do import_services.py; serviços antigos sem a chave ficam de fora
+        IndexModel([('natural_key', ASCENDING)], unique=True,
+                   partialFilterExpression={'natural_key': {'$exists': True}}),
+    ],
+    'posts': [
+        IndexModel([('geo', GEOSPHERE), ('type', ASCENDING), ('category', ASCENDING)]),
+    ],
+    'notifications': [
+        IndexModel([('user_id', ASCENDING), ('created_at', DESCENDING)]),
+        IndexModel([('user_id', ASCENDING), ('read', ASCENDING)]),
+        # Cascatas da exclusão de posts e de usuários
+        IndexModel([('post_id', ASCENDING)]),
+        IndexModel([('from_user_id', ASCENDING)]),
+    ],
+    'notification_counters': [
+        IndexModel([('user_id', ASCENDING)], unique=True),
+    ],
+}
+
+async def ensure_indexes(db):
+    for collection, indexes in INDEXES.items():
+        await db[collection].create_indexes(indexes)
@@ -0,0 +1,105 @@
+"""
+Exportação administrativa em streaming (NDJSON/CSV)
+Lê direto de um cursor do Mongo em lotes, sem carregar a coleção em memória
+"""
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional
+
+# Campos sensíveis nunca saem na exportação, mesmo se pedidos explicitamente
+EXPORT_COLLECTIONS = {
+    'users': {
+        'exclude': ['password'],
+        'csv_fields': ['id', 'email', 'name', 'role', 'languages', 'help_categories', 'need_categories', 'created_at'],
+    },
+    'posts': {
+        'exclude': [],
+        'csv_fields': ['id', 'user_id', 'type', 'category', 'title', 'description', 'created_at'],
+    },
+    'messages': {
+        'exclude': [],
+        'csv_fields': ['id', 'from_user_id', 'to_user_id', 'message', 'is_auto_response', 'created_at'],
+    },
+    'ai_chats': {
+        'exclude': [],
+        'csv_fields': ['id', 'user_id', 'message', 'response', 'language', 'created_at'],
+    },
+}
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+def parse_fields(fields: Optional[str], collection: str) -> Optional[List[str]]:
+    """Converte 'a,b,c' numa lista de campos permitidos (None = todos)"""
+    if not fields:
+        return None
+    excluded = EXPORT_COLLECTIONS[collection]['exclude']
+    parsed = []
+    for name in fields.split(','):
+        name = name.strip()
+        if not name or name.startswith('$') or name in excluded or name in parsed:
+            continue
+        parsed.append(name)
+    return parsed or None
+
+def build_projection(collection: str, fields: Optional[List[str]]) -> dict:
+    if fields:
+        projection = {name: 1 for name in fields}
+        projection['_id'] = 0
+        return projection
+    projection = {'_id': 0}
+    for name in EXPORT_COLLECTIONS[collection]['exclude']:
+        projection[name] = 0
+    return projection
+
+def _to_iso(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+def build_date_filter(since: Optional[datetime], until: Optional[datetime]) -> dict:
+    """created_at é gravado como string ISO em UTC, então a comparação lexicográfica funciona"""
+    created_at = {}
+    if since:
+        created_at['$gte'] = _to_iso(since)
+    if until:
+        created_at['$lt'] = _to_iso(until)
+    return {'created_at': created_at} if created_at else {}
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return value
+
+async def stream_ndjson(cursor, batch_size: int) -> AsyncIterator[bytes]:
+    lines = []
+    async for doc in cursor:
+        lines.append(json.dumps(doc, ensure_ascii=False, default=str))
+        if len(lines) >= batch_size:
+            yield ('\n'.join(lines) + '\n').encode()
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode()
+
+async def stream_csv(cursor, fields: List[str], batch_size: int) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    rows = 0
+    async for doc in cursor:
+        writer.writerow([_csv_value(doc.get(name)) for name in fields])
+        rows += 1
+        if rows >= batch_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    tail = buffer.getvalue()
+    if tail:
+        yield tail.encode()
@@ -0,0 +1,75 @@
+"""
+Cache da primeira página do feed (GET /api/posts)
+Uma página renderizada (JSON pronto) por (tipo, categoria, faixa de visibilidade); a faixa
+vem das help_categories de voluntários/helpers, que só veem pedidos dessas categorias.
+Escritas em posts invalidam as páginas afetadas por tag neste worker e incrementam a
+versão do feed em db.meta, para os outros workers limparem as suas
+"""
+import logging
+from typing import Awaitable, Callable, Iterable, List, Optional, Tuple
+
+from cache import CacheNamespace
+from versions import bump_version, fetch_version
+
+logger = logging.getLogger(__name__)
+
+FEED_VERSION_ID = 'feed_version'
+
+def visibility_bucket(role: str, help_categories: Optional[List[str]]) -> str:
+    """Quem vê o mesmo conjunto de posts cai na mesma faixa (mesma regra do prepare_feed_post)"""
+    if role in ('volunteer', 'helper') and help_categories:
+        return 'help:' + ','.join(sorted(set(help_categories)))
+    return 'all'
+
+def feed_tag(post_type: Optional[str], category: Optional[str]) -> str:
+    return f"{post_type or '*'}|{category or '*'}"
+
+def affected_tags(post_type: Optional[str], category: Optional[str]) -> List[str]:
+    """Páginas que podem conter um post desse tipo/categoria: filtro exato ou sem filtro"""
+    return [feed_tag(t, c) for t in {None, post_type} for c in {None, category}]
+
+class FeedCache:
+    def __init__(self, namespace: CacheNamespace):
+        self.namespace = namespace
+        self.version = None
+
+    async def load_version(self, db):
+        self.version = await fetch_version(db, FEED_VERSION_ID)
+
+    async def get_page(self, post_type: Optional[str], category: Optional[str], bucket: str,
+                       render: Callable[[], Awaitable[bytes]]) -> bytes:
+        tag = feed_tag(post_type, category)
+        # Uma render que termina depois de uma invalidação da tag não é gravada (get_or_load)
+        return await self.namespace.get_or_load(f'{tag}|{bucket}', render, tags=[tag])
+
+    async def posts_changed(self, db, changes: Iterable[Tuple[Optional[str], Optional[str]]]):
+        """Invalida as páginas que podem conter posts com esses (tipo, categoria)"""
+        tags = set()
+        for post_type, category in changes:
+            tags.update(affected_tags(post_type, category))
+        if not tags:
+            return
+        await self.namespace.invalidate_tags(*tags)
+        await self._bump(db)
+
+    async def clear(self, db):
+        """Para mudanças que atingem qualquer página (ex: nome ou papel de um autor)"""
+        await self.namespace.clear()
+        await self._bump(db)
+
+    async def _bump(self, db):
+        try:
+            version = await bump_version(db, FEED_VERSION_ID)
+        except Exception as e:
+            # A escrita já foi feita: os outros workers ficam defasados só até o TTL
+            logger.error(f"Feed version bump failed: {str(e)}")
+            return
+        # Se outro worker também mudou o feed desde a última versão vista, limpa tudo aqui
+        if self.version is not None and version != self.version + 1:
+            await self.namespace.clear()
+        self.version = version
+
+    async def on_version_change(self, version: int):
+        if version != self.version:
+            self.version = version
+            await self.namespace.clear()
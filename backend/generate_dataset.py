@@ -0,0 +1,355 @@
+"""
+Gerador de dados sintéticos em larga escala para testes de carga
+Cria usuários (todos os papéis), posts nas 10 categorias, comentários, conversas longas,
+matches e ai_chats com distribuições realistas: atividade em lei de potência e
+localizações na região de Paris. Os inserts são em lotes e paralelos (processos + corrotinas)
+
+Uso: python generate_dataset.py --users 100000 --posts 300000 --messages 2000000 --workers 8
+"""
+import argparse
+import asyncio
+import bisect
+import itertools
+import multiprocessing
+import random
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, IndexModel, UpdateOne
+import os
+import bcrypt
+from dotenv import load_dotenv
+from pathlib import Path
+
+from chat_permissions import CATEGORIES
+from db_indexes import ensure_indexes
+from geo import to_point
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+GENERATED_COLLECTIONS = ('users', 'posts', 'comments', 'messages', 'matches', 'ai_chats')
+
+ID_NAMESPACE = uuid.UUID('6f1d3c2a-5b7e-4a90-8c11-2e4d9f7a0b35')
+
+ROLE_MIX = [('migrant', 0.60), ('volunteer', 0.25), ('helper', 0.14), ('admin', 0.01)]
+LANGUAGES = [('fr', 30), ('en', 20), ('ar', 15), ('pt', 8), ('es', 6), ('fa', 6), ('ps', 5), ('ti', 4), ('ru', 3), ('uk', 3)]
+# Pedidos de ajuda se concentram em algumas categorias
+CATEGORY_WEIGHTS = [25, 18, 14, 16, 10, 6, 4, 4, 2, 1]
+PROFESSIONAL_AREAS = ['legal', 'health', 'education', 'translation', 'family', 'employment', 'housing', 'administration', 'finance', 'technology']
+# Centros populacionais da Île-de-France: (lat, lng, desvio em graus, peso)
+LOCATION_CENTERS = [
+    (48.8566, 2.3522, 0.030, 50),   # Paris centro
+    (48.8867, 2.3431, 0.015, 12),   # 18e
+    (48.9362, 2.3574, 0.015, 10),   # Saint-Denis
+    (48.9146, 2.3821, 0.012, 8),    # Aubervilliers
+    (48.8638, 2.4485, 0.012, 8),    # Montreuil
+    (48.8131, 2.3880, 0.012, 6),    # Ivry / Vitry
+    (48.8924, 2.2069, 0.015, 6),    # Nanterre
+]
+AVAILABILITY = ['Segundas e quartas à noite', 'Fins de semana', 'Sábados pela manhã', 'Dias úteis 9h-17h', 'Flexível']
+WORDS = ('ajuda preciso documento moradia trabalho curso francês médico advogado comida roupa '
+         'transporte escola família urgente obrigado informação endereço horário associação').split()
+
+def entity_id(kind: str, index: int) -> str:
+    """Ids determinísticos: qualquer processo sabe o id do usuário i sem coordenação"""
+    return str(uuid.uuid5(ID_NAMESPACE, f"{kind}-{index}"))
+
+class PowerLaw:
+    """Sorteia índices em [0, n) com peso 1/(rank+1)^exponent"""
+
+    def __init__(self, n: int, exponent: float = 1.1):
+        self.cum_weights = list(itertools.accumulate(1.0 / (rank + 1) ** exponent for rank in range(n)))
+        self.total = self.cum_weights[-1] if n else 0
+
+    def sample(self, rng: random.Random) -> int:
+        return bisect.bisect_left(self.cum_weights, rng.random() * self.total)
+
+class Population:
+    """Faixas contíguas de índices por papel (migrantes primeiro, depois voluntários...)"""
+
+    def __init__(self, total_users: int):
+        self.ranges = {}
+        start = 0
+        for i, (role, share) in enumerate(ROLE_MIX):
+            count = total_users - start if i == len(ROLE_MIX) - 1 else int(total_users * share)
+            self.ranges[role] = (start, start + count)
+            start += count
+        self.total = total_users
+
+    def role_of(self, index: int) -> str:
+        for role, (start, end) in self.ranges.items():
+            if start <= index < end:
+                return role
+        raise IndexError(index)
+
+    def size(self, *roles) -> int:
+        return sum(self.ranges[role][1] - self.ranges[role][0] for role in roles)
+
+    def pick(self, rng: random.Random, law: PowerLaw, *roles) -> int:
+        """Usuário de um dos papéis, escolhido pela lei de potência (poucos muito ativos)"""
+        offset = law.sample(rng)
+        for role in roles:
+            start, end = self.ranges[role]
+            if offset < end - start:
+                return start + offset
+            offset -= end - start
+        raise IndexError(offset)
+
+class Generator:
+    def __init__(self, cfg, rng: random.Random):
+        self.cfg = cfg
+        self.rng = rng
+        self.population = Population(cfg.users)
+        self.now = datetime.now(timezone.utc)
+        self.migrant_law = PowerLaw(self.population.size('migrant'))
+        self.helper_law = PowerLaw(self.population.size('volunteer', 'helper'))
+        self.post_law = PowerLaw(cfg.posts) if cfg.posts else None
+        self.location_weights = [center[3] for center in LOCATION_CENTERS]
+        self.password_hash = cfg.password_hash
+
+    def timestamp(self) -> str:
+        return (self.now - timedelta(seconds=self.rng.random() * self.cfg.days * 86400)).isoformat()
+
+    def location(self) -> dict:
+        lat, lng, spread, _ = self.rng.choices(LOCATION_CENTERS, weights=self.location_weights)[0]
+        return {'lat': round(self.rng.gauss(lat, spread), 6), 'lng': round(self.rng.gauss(lng, spread * 1.5), 6)}
+
+    def categories(self, k_max: int) -> list:
+        k = self.rng.randint(1, k_max)
+        return sorted(set(self.rng.choices(CATEGORIES, weights=CATEGORY_WEIGHTS, k=k)))
+
+    def text(self, words: int) -> str:
+        return ' '.join(self.rng.choices(WORDS, k=words)).capitalize()
+
+    def user(self, index: int) -> dict:
+        role = self.population.role_of(index)
+        languages = sorted(set(self.rng.choices([l for l, _ in LANGUAGES], weights=[w for _, w in LANGUAGES], k=self.rng.randint(1, 3))))
+        doc = {
+            'id': entity_id('user', index),
+            'email': f"user{index}@loadtest.local",
+            'name': f"Usuário {index}",
+            'display_name': None,
+            'use_display_name': False,
+            'role': role,
+            'location': self.location() if self.rng.random() < 0.7 else None,
+            'bio': None,
+            'languages': languages,
+            'categories': [],
+            'created_at': self.timestamp(),
+            'password': self.password_hash,
+        }
+        if role == 'volunteer':
+            doc.update({
+                'professional_area': self.rng.choice(PROFESSIONAL_AREAS),
+                'professional_specialties': [],
+                'availability': self.rng.choice(AVAILABILITY),
+                'help_types': [],
+                'help_categories': self.categories(4),
+                'certifications': [],
+            })
+        elif role == 'helper':
+            doc['help_categories'] = self.categories(3)
+        elif role == 'migrant':
+            doc['need_categories'] = self.categories(3) if self.rng.random() < 0.6 else []
+        return doc
+
+    def post(self, index: int) -> dict:
+        is_need = self.rng.random() < 0.7
+        if is_need:
+            author = self.population.pick(self.rng, self.migrant_law, 'migrant')
+        else:
+            author = self.population.pick(self.rng, self.helper_law, 'volunteer', 'helper')
+        location = self.location() if self.rng.random() < 0.4 else None
+        doc = {
+            'id': entity_id('post', index),
+            'user_id': entity_id('user', author),
+            'type': 'need' if is_need else 'offer',
+            'category': self.rng.choices(CATEGORIES, weights=CATEGORY_WEIGHTS)[0],
+            'title': self.text(4),
+            'description': self.text(self.rng.randint(10, 60)),
+            'location': location,
+            'images': [],
+            'created_at': self.timestamp(),
+        }
+        if location:
+            doc['geo'] = to_point(location)
+        return doc
+
+    def comment(self, index: int) -> dict:
+        author = self.rng.randrange(self.population.total)
+        return {
+            'id': entity_id('comment', index),
+            'post_id': entity_id('post', self.post_law.sample(self.rng)),
+            'user_id': entity_id('user', author),
+            'comment': self.text(self.rng.randint(3, 25)),
+            'created_at': self.timestamp(),
+        }
+
+    def thread(self, index: int) -> list:
+        """Conversa migrante <-> voluntário com tamanho em lei de potência"""
+        migrant = entity_id('user', self.population.pick(self.rng, self.migrant_law, 'migrant'))
+        helper = entity_id('user', self.population.pick(self.rng, self.helper_law, 'volunteer', 'helper'))
+        length = min(self.cfg.max_thread_length, int(self.rng.paretovariate(1.2) * 3))
+        start = datetime.fromisoformat(self.timestamp())
+        messages = []
+        for position in range(length):
+            sender, receiver = (migrant, helper) if position % 2 == 0 else (helper, migrant)
+            messages.append({
+                'id': entity_id('message', index * self.cfg.max_thread_length + position),
+                'from_user_id': sender,
+                'to_user_id': receiver,
+                'message': self.text(self.rng.randint(2, 30)),
+                'location': None,
+                'media': [],
+                'media_type': None,
+                'created_at': (start + timedelta(minutes=position * self.rng.randint(1, 120))).isoformat(),
+            })
+        return messages
+
+    def match(self, index: int) -> dict:
+        return {
+            'id': entity_id('match', index),
+            'helper_id': entity_id('user', self.population.pick(self.rng, self.helper_law, 'volunteer', 'helper')),
+            'migrant_id': entity_id('user', self.population.pick(self.rng, self.migrant_law, 'migrant')),
+            'status': self.rng.choices(['pending', 'accepted', 'completed'], weights=[5, 3, 2])[0],
+            'created_at': self.timestamp(),
+        }
+
+    def ai_chat(self, index: int) -> dict:
+        return {
+            'id': entity_id('ai_chat', index),
+            'user_id': entity_id('user', self.population.pick(self.rng, self.migrant_law, 'migrant')),
+            'message': self.text(self.rng.randint(5, 20)) + '?',
+            'response': self.text(self.rng.randint(40, 150)),
+            'language': self.rng.choice(['pt', 'fr', 'en', 'ar']),
+            'created_at': self.timestamp(),
+        }
+
+def shard_range(total: int, shard: int, shards: int):
+    per_shard = -(-total // shards)
+    return range(shard * per_shard, min(total, (shard + 1) * per_shard))
+
+async def insert_batches(collection, docs, batch_size: int, concurrency: int, upsert: bool = False) -> int:
+    """
+    insert_many em lotes, com até `concurrency` lotes em voo ao mesmo tempo.
+    Com upsert, cada documento só é inserido se o id ainda não existir (reexecução sem --drop)
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    pending = set()
+    inserted = 0
+
+    async def insert(batch):
+        nonlocal inserted
+        try:
+            if upsert:
+                result = await collection.bulk_write([
+                    UpdateOne({'id': doc['id']}, {'$setOnInsert': doc}, upsert=True) for doc in batch
+                ], ordered=False)
+                inserted += result.upserted_count
+            else:
+                await collection.insert_many(batch, ordered=False)
+                inserted += len(batch)
+        finally:
+            semaphore.release()
+
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            await semaphore.acquire()
+            pending.add(asyncio.create_task(insert(batch)))
+            done = {task for task in pending if task.done()}
+            pending -= done
+            for task in done:
+                # Propaga a falha de um lote já terminado em vez de descartá-la
+                task.result()
+            batch = []
+    if batch:
+        await semaphore.acquire()
+        pending.add(asyncio.create_task(insert(batch)))
+    await asyncio.gather(*pending)
+    return inserted
+
+async def run_shard_async(cfg, shard: int) -> dict:
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], maxPoolSize=cfg.concurrency + 2)
+    db = client[os.environ['DB_NAME']]
+    gen = Generator(cfg, random.Random(cfg.seed * 1000 + shard))
+    
+    def messages():
+        for index in shard_range(cfg.threads, shard, cfg.workers):
+            yield from gen.thread(index)
+    
+    plan = [
+        ('users', (gen.user(i) for i in shard_range(cfg.users, shard, cfg.workers))),
+        ('posts', (gen.post(i) for i in shard_range(cfg.posts, shard, cfg.workers))),
+        ('comments', (gen.comment(i) for i in shard_range(cfg.comments if cfg.posts else 0, shard, cfg.workers))),
+        ('messages', messages()),
+        ('matches', (gen.match(i) for i in shard_range(cfg.matches, shard, cfg.workers))),
+        ('ai_chats', (gen.ai_chat(i) for i in shard_range(cfg.ai_chats, shard, cfg.workers))),
+    ]
+    counts = {}
+    for name, docs in plan:
+        counts[name] = await insert_batches(db[name], docs, cfg.batch_size, cfg.concurrency, upsert=not cfg.drop)
+    client.close()
+    return counts
+
+def run_shard(args) -> dict:
+    cfg, shard = args
+    return asyncio.run(run_shard_async(cfg, shard))
+
+async def prepare(cfg):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    if cfg.drop:
+        for name in ('users', 'posts', 'comments', 'messages', 'matches', 'ai_chats', 'notifications', 'notification_counters'):
+            await db[name].drop()
+    else:
+        # Sem --drop os lotes viram upserts por id, que precisam do índice desde o início
+        for name in GENERATED_COLLECTIONS:
+            await db[name].create_indexes([IndexModel([('id', ASCENDING)])])
+    client.close()
+
+async def finish():
+    # Criar índices depois da carga é bem mais rápido do que mantê-los durante os inserts
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    await ensure_indexes(client[os.environ['DB_NAME']])
+    client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos para testes de carga")
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--posts', type=int, default=30000)
+    parser.add_argument('--comments', type=int, default=60000)
+    parser.add_argument('--threads', type=int, default=20000, help="Conversas diretas (cada uma com várias mensagens)")
+    parser.add_argument('--max-thread-length', type=int, default=500)
+    parser.add_argument('--matches', type=int, default=5000)
+    parser.add_argument('--ai-chats', type=int, default=20000)
+    parser.add_argument('--days', type=int, default=365, help="Janela de datas de criação")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=4, help="Lotes em voo por processo")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Processos geradores")
+    parser.add_argument('--password', default='loadtest123', help="Senha de todos os usuários gerados")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--drop', action='store_true',
+                        help="Apaga as coleções antes de gerar (sem ele, ids já existentes não são reinseridos)")
+    cfg = parser.parse_args()
+    
+    # bcrypt é caro: um único hash compartilhado por todos os usuários
+    cfg.password_hash = bcrypt.hashpw(cfg.password.encode(), bcrypt.gensalt()).decode()
+    
+    started = time.perf_counter()
+    asyncio.run(prepare(cfg))
+    with multiprocessing.Pool(cfg.workers) as pool:
+        results = pool.map(run_shard, [(cfg, shard) for shard in range(cfg.workers)])
+    asyncio.run(finish())
+    elapsed = time.perf_counter() - started
+    
+    totals = {name: sum(result[name] for result in results) for name in results[0]}
+    for name, count in totals.items():
+        print(f"✅ {name}: {count}")
+    print(f"Total: {sum(totals.values())} documentos em {elapsed:.1f}s ({sum(totals.values()) / elapsed:.0f} docs/s)")
+
+if __name__ == "__main__":
+    main()
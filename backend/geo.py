@@ -0,0 +1,51 @@
+"""
+Utilitários geográficos (distâncias e normalização de coordenadas)
+"""
+import math
+from typing import Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+
+def coords(location: Optional[dict]) -> Optional[Tuple[float, float]]:
+    """Extrai (lat, lng) de um dict {'lat', 'lng'}; None se ausente ou inválido"""
+    if not isinstance(location, dict):
+        return None
+    try:
+        lat = float(location['lat'])
+        lng = float(location['lng'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+def to_point(location: Optional[dict]) -> Optional[dict]:
+    """Converte {'lat', 'lng'} num ponto GeoJSON (coordenadas na ordem [lng, lat])"""
+    point = coords(location)
+    if not point:
+        return None
+    return {'type': 'Point', 'coordinates': [point[1], point[0]]}
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Distância em km entre dois pontos na superfície da Terra"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lng, max_lng) que contém o círculo de raio radius_km"""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(lat))
+    dlng = 180.0 if cos_lat < 1e-6 else min(180.0, math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)))
+    return max(-90.0, lat - dlat), min(90.0, lat + dlat), lng - dlng, lng + dlng
+
+def mercator(lat: float, lng: float) -> Tuple[float, float]:
+    """Projeção Web Mercator normalizada: (x, y) em [0, 1], y cresce para o sul"""
+    lat = max(-85.05112878, min(85.05112878, lat))
+    sin_lat = math.sin(math.radians(lat))
+    x = lng / 360.0 + 0.5
+    y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return x, y
@@ -0,0 +1,207 @@
+"""
+Importação idempotente do diretório de serviços (substitui seed_data.py e init_data.py)
+Lê JSON, NDJSON ou CSV em streaming, normaliza endereços e coordenadas, deduplica
+pela chave natural (categoria + nome + endereço) e aplica tudo num único bulk_write de upserts.
+Os serviços sem chave natural, criados pelos antigos scripts de seed ('serv-1', ...),
+são removidos em todo import; --prune remove também os que não estão no arquivo
+
+Uso: python import_services.py data/services.json [--prune]
+"""
+import argparse
+import asyncio
+import csv
+import json
+import time
+import unicodedata
+import uuid
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+from typing import Iterator, Optional
+
+from db_indexes import ensure_indexes
+from geo import coords, to_point
+from service_index import bump_services_version
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# Namespace fixo: a mesma chave natural sempre gera o mesmo id
+SERVICE_ID_NAMESPACE = uuid.UUID('3b0f7c52-8d0e-4f6e-9a43-6c1d2f0b9e11')
+
+SERVICE_FIELDS = ['name', 'category', 'description', 'address', 'phone', 'hours']
+
+JSON_CHUNK_SIZE = 64 * 1024
+
+def iter_json_array(f, chunk_size: int = JSON_CHUNK_SIZE) -> Iterator:
+    """Elementos de um array JSON no topo do arquivo, sem carregar o arquivo inteiro"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+    while True:
+        # Pula espaços, o '[' inicial e as vírgulas entre elementos
+        while position < len(buffer) and (buffer[position].isspace() or buffer[position] == ','
+                                          or (not started and buffer[position] == '[')):
+            started = started or buffer[position] == '['
+            position += 1
+        if position < len(buffer) and started and buffer[position] == ']':
+            return
+        if position < len(buffer):
+            if not started:
+                raise ValueError("Expected a JSON array")
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Elemento cortado no fim do bloco: lê mais antes de desistir
+                if eof:
+                    raise
+            else:
+                # Um número no fim do bloco pode continuar no próximo
+                if end < len(buffer) or eof:
+                    yield value
+                    position = end
+                    continue
+        if eof:
+            raise ValueError("Unexpected end of JSON array")
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+def read_records(path: Path) -> Iterator[dict]:
+    """Lê registros um a um; .json é um array, .ndjson/.jsonl uma linha por registro"""
+    suffix = path.suffix.lower()
+    if suffix == '.csv':
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            yield from csv.DictReader(f)
+    elif suffix in ('.ndjson', '.jsonl'):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif suffix == '.json':
+        with open(path, encoding='utf-8') as f:
+            yield from iter_json_array(f)
+    else:
+        raise ValueError(f"Unsupported file type: {path.suffix}")
+
+def clean_text(value) -> Optional[str]:
+    if value is None:
+        return None
+    value = ' '.join(str(value).split())
+    return value or None
+
+def normalize_address(address) -> Optional[str]:
+    address = clean_text(address)
+    if not address:
+        return None
+    # "9-11 Rue Froissart ,75003  Paris" -> "9-11 Rue Froissart, 75003 Paris"
+    parts = [part.strip() for part in address.split(',')]
+    return ', '.join(part for part in parts if part)
+
+def _parse_coordinate(value) -> Optional[float]:
+    if value is None or value == '':
+        return None
+    try:
+        return float(str(value).replace(',', '.'))
+    except ValueError:
+        return None
+
+def normalize_location(record: dict) -> Optional[dict]:
+    location = record.get('location')
+    if isinstance(location, dict):
+        lat, lng = location.get('lat'), location.get('lng')
+    else:
+        lat, lng = record.get('lat'), record.get('lng')
+    point = coords({'lat': _parse_coordinate(lat), 'lng': _parse_coordinate(lng)})
+    if not point:
+        return None
+    return {'lat': point[0], 'lng': point[1]}
+
+def _key_part(value: str) -> str:
+    value = unicodedata.normalize('NFKD', value)
+    value = ''.join(ch for ch in value if not unicodedata.combining(ch)).lower()
+    return ' '.join(''.join(ch if ch.isalnum() else ' ' for ch in value).split())
+
+def natural_key(service: dict) -> str:
+    """categoria + nome + endereço normalizados: serviços diferentes no mesmo endereço não se fundem"""
+    return f"{service['category']}|{_key_part(service['name'])}|{_key_part(service.get('address') or '')}"
+
+def normalize_record(record: dict) -> Optional[dict]:
+    service = {field: clean_text(record.get(field)) for field in SERVICE_FIELDS}
+    service['address'] = normalize_address(record.get('address'))
+    if not service['name'] or not service['category']:
+        return None
+    service['category'] = service['category'].lower()
+    service['description'] = service['description'] or ''
+    service['location'] = normalize_location(record)
+    service['geo'] = to_point(service['location'])
+    service['natural_key'] = natural_key(service)
+    return service
+
+async def import_services(db, path: Path, prune: bool = False) -> dict:
+    started = time.perf_counter()
+    stats = {'read': 0, 'invalid': 0, 'duplicates': 0, 'upserted': 0, 'modified': 0, 'legacy': 0, 'pruned': 0}
+    
+    # Última ocorrência de cada chave natural vence
+    services = {}
+    for record in read_records(path):
+        stats['read'] += 1
+        service = normalize_record(record)
+        if not service:
+            stats['invalid'] += 1
+            continue
+        if service['natural_key'] in services:
+            stats['duplicates'] += 1
+        services[service['natural_key']] = service
+    
+    ops = []
+    for key, service in services.items():
+        update = {'$set': service, '$setOnInsert': {'id': str(uuid.uuid5(SERVICE_ID_NAMESPACE, key))}}
+        if not service['geo']:
+            del service['geo']
+            update['$unset'] = {'geo': ''}
+        ops.append(UpdateOne({'natural_key': key}, update, upsert=True))
+    
+    await ensure_indexes(db)
+    if ops:
+        result = await db.services.bulk_write(ops, ordered=False)
+        stats['upserted'] = result.upserted_count
+        stats['modified'] = result.modified_count
+    
+    # Serviços dos antigos seeds (ids 'serv-1', '1', ...) duplicariam os importados
+    result = await db.services.delete_many({'natural_key': {'$exists': False}})
+    stats['legacy'] = result.deleted_count
+    
+    if prune:
+        result = await db.services.delete_many({'natural_key': {'$nin': list(services)}})
+        stats['pruned'] = result.deleted_count
+    
+    # Workers recarregam catálogo, categorias e clusters ao ver a nova versão
+    stats['version'] = await bump_services_version(db)
+    stats['seconds'] = round(time.perf_counter() - started, 3)
+    return stats
+
+async def main():
+    parser = argparse.ArgumentParser(description="Importa o diretório de serviços")
+    parser.add_argument('path', type=Path, help="Arquivo .json, .ndjson/.jsonl ou .csv")
+    parser.add_argument('--prune', action='store_true', help="Remove serviços que não estão no arquivo")
+    args = parser.parse_args()
+    
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    
+    stats = await import_services(db, args.path, prune=args.prune)
+    print(f"✅ {stats['read']} registros lidos em {stats['seconds']}s: "
+          f"{stats['upserted']} novos, {stats['modified']} atualizados, {stats['duplicates']} duplicados, "
+          f"{stats['invalid']} inválidos, {stats['legacy']} legados e {stats['pruned']} removidos "
+          f"(versão {stats['version']})")
+    
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
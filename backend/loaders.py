@@ -0,0 +1,108 @@
+"""
+Loaders por requisição (estilo DataLoader)
+Os load() feitos na mesma volta do event loop viram uma única query com $in, e cada
+documento carregado fica memorizado até o fim da requisição. Os documentos são
+compartilhados entre os chamadores: copie antes de alterar
+"""
+import asyncio
+import contextvars
+from functools import cached_property
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+USER_LOADER_PROJECTION = {'_id': 0, 'password': 0}
+POST_LOADER_PROJECTION = {'_id': 0, 'geo': 0}
+
+class BatchLoader:
+    def __init__(self, batch_fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]], max_batch_size: int = 1000):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self._cache: Dict[Hashable, asyncio.Future] = {}
+        self._queue: List[Hashable] = []
+        self._scheduled = False
+
+    def load(self, key: Hashable) -> Awaitable[Optional[Any]]:
+        future = self._cache.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._cache[key] = loop.create_future()
+            self._queue.append(key)
+            if not self._scheduled:
+                # Roda depois dos callbacks já agendados: junta os load() desta volta do loop
+                self._scheduled = True
+                loop.call_soon(self._dispatch)
+        # shield: o cancelamento de um chamador não cancela o resultado compartilhado
+        return asyncio.shield(future)
+
+    async def load_many(self, keys: Iterable[Hashable]) -> List[Optional[Any]]:
+        return await asyncio.gather(*(self.load(key) for key in keys))
+
+    def prime(self, key: Hashable, value: Any):
+        """Memoriza um valor já conhecido (ex: o usuário autenticado)"""
+        if key not in self._cache:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+            self._cache[key] = future
+
+    def _dispatch(self):
+        keys, self._queue, self._scheduled = self._queue, [], False
+        for start in range(0, len(keys), self.max_batch_size):
+            asyncio.ensure_future(self._run_batch(keys[start:start + self.max_batch_size]))
+
+    async def _run_batch(self, keys: List[Hashable]):
+        try:
+            results = await self.batch_fn(keys)
+        except Exception as e:
+            for key in keys:
+                # Sem memorizar a falha: um próximo load() tenta de novo
+                future = self._cache.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key in keys:
+            future = self._cache[key]
+            if not future.done():
+                future.set_result(results.get(key))
+
+def documents_by_id(collection, projection: dict):
+    async def batch_fn(ids: List[str]) -> Dict[str, dict]:
+        return {doc['id']: doc async for doc in collection.find({'id': {'$in': ids}}, projection)}
+    return batch_fn
+
+class RequestLoaders:
+    """Os loaders só são criados quando a rota usa (a maioria das requisições não usa os dois)"""
+
+    def __init__(self, db):
+        self.db = db
+
+    @cached_property
+    def users(self) -> BatchLoader:
+        return BatchLoader(documents_by_id(self.db.users, USER_LOADER_PROJECTION))
+
+    @cached_property
+    def posts(self) -> BatchLoader:
+        return BatchLoader(documents_by_id(self.db.posts, POST_LOADER_PROJECTION))
+
+_request_loaders: contextvars.ContextVar = contextvars.ContextVar('request_loaders', default=None)
+
+def current_loaders(db) -> RequestLoaders:
+    """Loaders da requisição atual; fora de uma requisição, um conjunto novo (sem memória compartilhada)"""
+    loaders = _request_loaders.get()
+    return loaders if loaders is not None else RequestLoaders(db)
+
+class LoaderMiddleware:
+    """Cria os loaders no início de cada requisição HTTP (factory recebe nada, devolve RequestLoaders)"""
+
+    def __init__(self, app, factory: Callable[[], RequestLoaders]):
+        self.app = app
+        self.factory = factory
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        token = _request_loaders.set(self.factory())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_loaders.reset(token)
@@ -0,0 +1,191 @@
+"""
+Entrypoint de produção: `python backend/main.py`
+O processo mestre abre o socket, pré-carrega os dados somente-leitura (índice do guia e
+catálogo de serviços) e faz fork dos workers uvicorn (uvloop + httptools), que herdam o
+socket e a memória já carregada. SIGTERM/SIGINT são repassados aos workers, que param de
+aceitar conexões e terminam as requisições em andamento antes de sair. Um worker que não
+consegue subir (lifespan falhou) derruba o mestre, como no gunicorn, em vez de respawn infinito.
+
+Estado por processo com vários workers (WEB_CONCURRENCY=1 volta ao processo único):
+- métricas: cada worker grava um snapshot em METRICS_MULTIPROC_DIR e o /metrics soma todos
+- permissões de chat, perfis em cache, feed e catálogo de serviços: as escritas publicam uma
+  versão em db.meta e os outros workers invalidam ou recarregam em ~1s
+- índice de sugestões (matching): recarga completa a cada MATCHING_INDEX_REFRESH_SECONDS;
+  sugestões e destinatários de notificação podem ficar defasados até lá
+- fila de notificações: do worker que criou o post; esvaziada no desligamento, perdida se
+  o processo cair
+- demais caches em memória (estatísticas do admin, respostas da IA): só TTL; use
+  CACHE_BACKEND=redis para compartilhar
+- /admin/traces, /admin/startup e /admin/profile: mostram só o worker que atendeu a
+  requisição (cada trace traz o pid); TRACE_EXPORT_PATH junta os traces de todos
+"""
+import gc
+import logging
+import os
+import signal
+import sys
+import tempfile
+import time
+
+import uvicorn
+from pymongo import MongoClient
+
+import server
+from metrics import REGISTRY
+from service_index import SERVICES_VERSION_ID
+
+logger = logging.getLogger('main')
+
+HOST = os.environ.get('HOST', '0.0.0.0')
+PORT = int(os.environ.get('PORT', '8001'))
+BACKLOG = int(os.environ.get('BACKLOG', '2048'))
+KEEP_ALIVE_SECONDS = int(os.environ.get('KEEP_ALIVE_SECONDS', '75'))
+GRACEFUL_SHUTDOWN_SECONDS = int(os.environ.get('GRACEFUL_SHUTDOWN_SECONDS', '30'))
+RESPAWN_DELAY_SECONDS = 1.0
+# Mesmo código de saída do uvicorn/gunicorn para falha no boot do worker
+WORKER_BOOT_ERROR = 3
+# Workers que morrem antes disso contam como falha de boot; após MAX_BOOT_FAILURES seguidas o mestre para
+MIN_WORKER_UPTIME_SECONDS = float(os.environ.get('MIN_WORKER_UPTIME_SECONDS', '10'))
+MAX_BOOT_FAILURES = int(os.environ.get('MAX_BOOT_FAILURES', '5'))
+
+def default_workers() -> int:
+    # Respeita o cpuset do container, não só o total de cores da máquina
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    return max(1, cores)
+
+WORKERS = int(os.environ.get('WEB_CONCURRENCY') or default_workers())
+
+def preload_shared_data():
+    """Carrega antes do fork o que é somente-leitura, para os workers compartilharem as páginas"""
+    server.get_pdf_processor().load_index()
+
+    # Leitura síncrona: o client do Motor só é criado no lifespan de cada worker
+    sync_client = MongoClient(os.environ['MONGO_URL'], serverSelectionTimeoutMS=5000)
+    try:
+        sync_db = sync_client[os.environ['DB_NAME']]
+        version_doc = sync_db.meta.find_one({'_id': SERVICES_VERSION_ID})
+        version = version_doc['version'] if version_doc else 0
+        services = list(sync_db.services.find({}, {'_id': 0, 'geo': 0}))
+    except Exception as e:
+        # Sem preload os workers carregam tudo no startup, como em desenvolvimento
+        logger.error(f"Preload of services catalog failed: {str(e)}")
+        return
+    finally:
+        sync_client.close()
+
+    server.services_catalog.load(services, version)
+    server.service_clusters.rebuild(services, version)
+    logger.info(f"Preloaded {len(services)} services (version {version})")
+
+def build_config() -> uvicorn.Config:
+    return uvicorn.Config(
+        server.app,
+        host=HOST,
+        port=PORT,
+        loop='uvloop',
+        http='httptools',
+        lifespan='on',
+        backlog=BACKLOG,
+        timeout_keep_alive=KEEP_ALIVE_SECONDS,
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_SECONDS,
+        proxy_headers=True,
+        forwarded_allow_ips=os.environ.get('FORWARDED_ALLOW_IPS', '*'),
+    )
+
+def spawn_worker(config: uvicorn.Config, sock) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+
+    # Worker: o uvicorn instala os próprios handlers de SIGTERM/SIGINT (drain gracioso)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    code = 0
+    try:
+        worker = uvicorn.Server(config)
+        worker.run(sockets=[sock])
+        # Falha no lifespan não levanta exceção: o uvicorn só retorna sem ter iniciado
+        if not worker.started:
+            logger.error("Worker failed to boot")
+            code = WORKER_BOOT_ERROR
+    except BaseException:
+        logger.exception("Worker crashed")
+        code = 1
+    finally:
+        os._exit(code)
+
+def run_master(config: uvicorn.Config) -> int:
+    sock = config.bind_socket()
+    # Cada worker grava suas métricas aqui; o /metrics de qualquer um agrega todos
+    REGISTRY.enable_multiprocess(os.environ.get('METRICS_MULTIPROC_DIR') or tempfile.mkdtemp(prefix='watizat-metrics-'))
+    preload_shared_data()
+    # Objetos pré-carregados vão para a geração permanente: o GC dos workers não toca nessas
+    # páginas, que continuam compartilhadas (copy-on-write) entre os processos
+    gc.collect()
+    gc.freeze()
+
+    workers = {}  # pid -> instante do spawn
+    stopping = False
+    exit_code = 0
+    boot_failures = 0
+
+    def handle_exit(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, handle_exit)
+    signal.signal(signal.SIGINT, handle_exit)
+
+    for _ in range(WORKERS):
+        workers[spawn_worker(config, sock)] = time.monotonic()
+    logger.info(f"Serving on {HOST}:{PORT} with {WORKERS} workers (master pid {os.getpid()})")
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        spawned_at = workers.pop(pid, None)
+        if stopping or spawned_at is None:
+            continue
+        code = os.waitstatus_to_exitcode(status)
+        if code == WORKER_BOOT_ERROR or time.monotonic() - spawned_at < MIN_WORKER_UPTIME_SECONDS:
+            boot_failures += 1
+        else:
+            boot_failures = 0
+        if code == WORKER_BOOT_ERROR or boot_failures >= MAX_BOOT_FAILURES:
+            # Respawn não resolve (banco fora, configuração errada): deixa o supervisor decidir
+            logger.error(f"Worker {pid} failed to boot (status {code}), shutting down")
+            exit_code = WORKER_BOOT_ERROR
+            handle_exit(None, None)
+            continue
+        logger.error(f"Worker {pid} exited with status {code}, respawning")
+        time.sleep(RESPAWN_DELAY_SECONDS)
+        workers[spawn_worker(config, sock)] = time.monotonic()
+
+    sock.close()
+    logger.info("All workers stopped")
+    return exit_code
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    config = build_config()
+    if WORKERS == 1:
+        preload_shared_data()
+        single = uvicorn.Server(config)
+        single.run()
+        return 0 if single.started else WORKER_BOOT_ERROR
+    return run_master(config)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+Motor de sugestões de voluntários/helpers para migrantes
+Mantém índices invertidos em memória (categoria -> usuários, idioma -> usuários)
+atualizados a cada escrita de perfil, para ranquear milhares de voluntários em milissegundos
+"""
+import asyncio
+import heapq
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+from geo import coords, haversine_km
+
+logger = logging.getLogger(__name__)
+
+HELPER_ROLES = ('volunteer', 'helper')
+
+# Pesos do score final (somam 1.0)
+WEIGHT_CATEGORY = 0.5
+WEIGHT_LANGUAGE = 0.2
+WEIGHT_DISTANCE = 0.2
+WEIGHT_AVAILABILITY = 0.1
+# Acima desta distância o componente geográfico vale zero
+MAX_DISTANCE_KM = 50.0
+
+PROFILE_PROJECTION = {
+    '_id': 0, 'id': 1, 'name': 1, 'display_name': 1, 'use_display_name': 1, 'role': 1,
+    'languages': 1, 'help_categories': 1, 'location': 1, 'availability': 1, 'professional_area': 1,
+}
+
+class HelperProfile:
+    __slots__ = ('id', 'role', 'name', 'categories', 'languages', 'coords', 'availability', 'professional_area')
+
+    def __init__(self, doc: dict):
+        self.id = doc['id']
+        self.role = doc['role']
+        self.name = doc.get('display_name') if doc.get('use_display_name') else doc.get('name')
+        self.categories = frozenset(doc.get('help_categories') or [])
+        self.languages = frozenset(doc.get('languages') or [])
+        self.coords = coords(doc.get('location'))
+        self.availability = doc.get('availability')
+        self.professional_area = doc.get('professional_area')
+
+    def card(self) -> dict:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'role': self.role,
+            'professional_area': self.professional_area,
+            'availability': self.availability,
+            'languages': sorted(self.languages),
+            'help_categories': sorted(self.categories),
+        }
+
+class MatchingIndex:
+    def __init__(self):
+        self.profiles: Dict[str, HelperProfile] = {}
+        self.by_category: Dict[str, Set[str]] = defaultdict(set)
+        self.by_language: Dict[str, Set[str]] = defaultdict(set)
+        # Voluntários/helpers sem help_categories (recebem todas as notificações de pedidos)
+        self.uncategorized: Set[str] = set()
+        self.loaded = False
+
+    async def load(self, db):
+        """Reconstrói o índice a partir da coleção users"""
+        fresh = MatchingIndex()
+        cursor = db.users.find({'role': {'$in': list(HELPER_ROLES)}}, PROFILE_PROJECTION).batch_size(1000)
+        async for doc in cursor:
+            fresh.upsert(doc)
+        self.profiles = fresh.profiles
+        self.by_category = fresh.by_category
+        self.by_language = fresh.by_language
+        self.uncategorized = fresh.uncategorized
+        self.loaded = True
+        logger.info(f"Matching index loaded with {len(self.profiles)} helpers")
+
+    async def refresh_forever(self, db, interval: float):
+        """Recarrega periodicamente para captar escritas feitas por outros workers"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.load(db)
+            except Exception as e:
+                logger.error(f"Matching index refresh failed: {str(e)}")
+
+    def upsert(self, doc: dict):
+        """Atualiza (ou remove, se não for mais voluntário/helper) a entrada de um usuário"""
+        self.remove(doc['id'])
+        if doc.get('role') not in HELPER_ROLES:
+            return
+        profile = HelperProfile(doc)
+        self.profiles[profile.id] = profile
+        for category in profile.categories:
+            self.by_category[category].add(profile.id)
+        if not profile.categories:
+            self.uncategorized.add(profile.id)
+        for language in profile.languages:
+            self.by_language[language].add(profile.id)
+
+    def remove(self, user_id: str):
+        profile = self.profiles.pop(user_id, None)
+        if not profile:
+            return
+        self.uncategorized.discard(user_id)
+        for category in profile.categories:
+            self._discard(self.by_category, category, user_id)
+        for language in profile.languages:
+            self._discard(self.by_language, language, user_id)
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], key: str, user_id: str):
+        members = index.get(key)
+        if members is not None:
+            members.discard(user_id)
+            if not members:
+                del index[key]
+
+    def _candidates(self, needs: Set[str], languages: Set[str]) -> Iterable[str]:
+        candidates = set()
+        for category in needs:
+            candidates |= self.by_category.get(category, set())
+        if not candidates:
+            for language in languages:
+                candidates |= self.by_language.get(language, set())
+        return candidates
+
+    def rank(
+        self,
+        needs: Iterable[str],
+        languages: Iterable[str],
+        location: Optional[dict] = None,
+        limit: int = 20,
+        exclude: Optional[Set[str]] = None
+    ) -> List[dict]:
+        """Retorna os melhores voluntários/helpers para as necessidades informadas"""
+        needs = set(needs)
+        languages = set(languages)
+        origin = coords(location)
+        exclude = exclude or set()
+
+        scored = []
+        for user_id in self._candidates(needs, languages):
+            if user_id in exclude:
+                continue
+            profile = self.profiles[user_id]
+            matching_categories = needs & profile.categories
+            shared_languages = languages & profile.languages
+
+            score = 0.0
+            if needs:
+                score += WEIGHT_CATEGORY * len(matching_categories) / len(needs)
+            if shared_languages:
+                score += WEIGHT_LANGUAGE
+            distance_km = None
+            if origin and profile.coords:
+                distance_km = haversine_km(origin[0], origin[1], profile.coords[0], profile.coords[1])
+                score += WEIGHT_DISTANCE * max(0.0, 1 - distance_km / MAX_DISTANCE_KM)
+            if profile.availability:
+                score += WEIGHT_AVAILABILITY
+
+            scored.append((score, user_id, matching_categories, shared_languages, distance_km))
+
+        best = heapq.nlargest(limit, scored, key=lambda item: (item[0], item[1]))
+        return [
+            {
+                'user': self.profiles[user_id].card(),
+                'score': round(score, 4),
+                'matching_categories': sorted(matching_categories),
+                'shared_languages': sorted(shared_languages),
+                'distance_km': round(distance_km, 2) if distance_km is not None else None,
+            }
+            for score, user_id, matching_categories, shared_languages, distance_km in best
+        ]
@@ -0,0 +1,271 @@
+"""
+Métricas no formato texto do Prometheus, sem dependências externas
+Contadores, gauges e histogramas com labels; as atualizações usam um lock por
+métrica porque alguns listeners (PyMongo) rodam em threads do executor do Motor.
+Com vários workers (main.py) cada processo grava um snapshot num diretório comum e o
+/metrics de qualquer worker soma contadores e histogramas de todos; gauges saem por worker
+"""
+import asyncio
+import bisect
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names: Sequence[str], values: Tuple, extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class _Metric:
+    type = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def header(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._series().items()]
+
+    def merge(self, snapshots: Iterable[Tuple[int, bool, list]]) -> list:
+        """Soma as séries de todos os processos; snapshots = (pid, vivo, snapshot)"""
+        merged = {}
+        for pid, alive, snapshot in snapshots:
+            for labels, value in snapshot:
+                labels = tuple(labels)
+                merged[labels] = self._add(merged.get(labels), value)
+        return list(merged.items())
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def _series(self) -> dict:
+        return self.values
+
+    @staticmethod
+    def _add(total, value):
+        return value if total is None else total + value
+
+    def render(self, items: Optional[list] = None, labelnames: Optional[Tuple[str, ...]] = None) -> List[str]:
+        if items is None:
+            with self._lock:
+                items = list(self.values.items())
+        labelnames = labelnames or self.labelnames
+        return [f'{self.name}{_labels(labelnames, labels)} {_number(value)}' for labels, value in items]
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self.values[labels] = value
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def merge(self, snapshots: Iterable[Tuple[int, bool, list]]) -> list:
+        """Gauges não somam: uma série por worker vivo, com o label worker=pid"""
+        return [
+            (tuple(labels) + (str(pid),), value)
+            for pid, alive, snapshot in snapshots if alive
+            for labels, value in snapshot
+        ]
+
+    def render(self, items: Optional[list] = None, labelnames: Optional[Tuple[str, ...]] = None) -> List[str]:
+        if items is not None and labelnames is None:
+            labelnames = self.labelnames + ('worker',)
+        return super().render(items, labelnames)
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[Tuple, list] = {}  # labels -> [contagens por bucket..., +Inf, soma]
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def _series(self) -> dict:
+        return {labels: list(series) for labels, series in self.series.items()}
+
+    @staticmethod
+    def _add(total, series):
+        return list(series) if total is None else [a + b for a, b in zip(total, series)]
+
+    def render(self, items: Optional[list] = None) -> List[str]:
+        if items is None:
+            with self._lock:
+                items = [(labels, list(series)) for labels, series in self.series.items()]
+        lines = []
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+        # Diretório compartilhado pelos workers; None = processo único
+        self.directory: Optional[str] = None
+
+    def register(self, metric: _Metric):
+        self.metrics.append(metric)
+
+    def enable_multiprocess(self, directory: str):
+        """Chamado pelo mestre antes do fork: limpa snapshots de execuções anteriores"""
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+            os.remove(path)
+        self.directory = directory
+
+    def write_snapshot(self):
+        snapshot = {metric.name: metric.snapshot() for metric in self.metrics}
+        path = os.path.join(self.directory, f'metrics-{os.getpid()}.json')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def _read_snapshots(self) -> List[Tuple[int, bool, dict]]:
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            pid = int(os.path.basename(path)[len('metrics-'):-len('.json')])
+            try:
+                with open(path) as f:
+                    snapshots.append((pid, _pid_alive(pid), json.load(f)))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping metrics snapshot {path}: {str(e)}")
+        return snapshots
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def render_all(self) -> str:
+        """
+        Métricas de todos os workers. Contadores de workers que morreram continuam somados
+        (não voltam para trás); as dos outros workers têm até METRICS_EXPORT_SECONDS de atraso
+        """
+        if self.directory is None:
+            return self.render()
+        self.write_snapshot()
+        snapshots = self._read_snapshots()
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.render(metric.merge(
+                (pid, alive, snapshot.get(metric.name, [])) for pid, alive, snapshot in snapshots
+            )))
+        return '\n'.join(lines) + '\n'
+
+    async def export_forever(self, interval: float):
+        """Grava o snapshot deste worker periodicamente, fora do event loop"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.write_snapshot)
+            except Exception as e:
+                logger.error(f"Metrics snapshot failed: {str(e)}")
+
+REGISTRY = Registry()
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+HTTP_REQUESTS = Counter('http_requests_total', 'Total de requisições HTTP', ['method', 'route', 'status_class'])
+HTTP_IN_FLIGHT = Gauge('http_requests_in_flight', 'Requisições HTTP em andamento')
+HTTP_LATENCY = Histogram('http_request_duration_seconds', 'Latência das requisições HTTP', ['method', 'route'])
+
+def route_template(scope: dict) -> str:
+    """Template da rota casada (ex: /api/messages/{other_user_id}), para não explodir a cardinalidade"""
+    route = scope.get('route')
+    return getattr(route, 'path', None) or 'unmatched'
+
+class MetricsMiddleware:
+    """Middleware ASGI puro: mede cada requisição HTTP por template de rota"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec()
+            method = scope['method']
+            route = route_template(scope)
+            HTTP_REQUESTS.inc(method, route, f'{status_code // 100}xx')
+            HTTP_LATENCY.observe(elapsed, method, route)
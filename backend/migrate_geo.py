@@ -0,0 +1,48 @@
+"""
+Migra 'location' ({lat, lng}) para pontos GeoJSON no campo 'geo' de services e posts
+Idempotente: só toca documentos com location e sem geo. Uso: python migrate_geo.py
+"""
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+from db_indexes import ensure_indexes
+from geo import to_point
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+BATCH_SIZE = 1000
+
+async def migrate_collection(collection) -> int:
+    migrated = 0
+    ops = []
+    query = {'location': {'$type': 'object'}, 'geo': {'$exists': False}}
+    async for doc in collection.find(query, {'_id': 1, 'location': 1}).batch_size(BATCH_SIZE):
+        point = to_point(doc['location'])
+        if not point:
+            continue
+        ops.append(UpdateOne({'_id': doc['_id']}, {'$set': {'geo': point}}))
+        if len(ops) >= BATCH_SIZE:
+            migrated += (await collection.bulk_write(ops, ordered=False)).modified_count
+            ops = []
+    if ops:
+        migrated += (await collection.bulk_write(ops, ordered=False)).modified_count
+    return migrated
+
+async def migrate():
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    
+    for name in ('services', 'posts'):
+        migrated = await migrate_collection(db[name])
+        print(f"✅ {name}: {migrated} documentos migrados para GeoJSON")
+    
+    await ensure_indexes(db)
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,223 @@
+"""
+Monitoramento de comandos e do pool de conexões do MongoDB
+Um CommandListener do PyMongo cronometra cada comando, registra queries lentas com o
+formato do filtro e conta quantos comandos cada requisição HTTP disparou. O Motor
+copia o contexto para as threads do executor, então o ContextVar da requisição é visível
+"""
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter as CommandCounter
+
+from pymongo import monitoring
+
+from metrics import Counter, Gauge, Histogram, route_template
+from tracing import record_span
+
+logger = logging.getLogger(__name__)
+
+MONGO_COMMAND_LATENCY = Histogram(
+    'mongo_command_duration_seconds', 'Latência dos comandos do MongoDB', ['command'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+MONGO_SLOW_COMMANDS = Counter('mongo_slow_commands_total', 'Comandos do MongoDB acima do limite de lentidão', ['command', 'collection'])
+MONGO_QUERIES_PER_REQUEST = Histogram(
+    'mongo_queries_per_request', 'Comandos do MongoDB por requisição HTTP', ['method', 'route'],
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+)
+N_PLUS_ONE_REQUESTS = Counter('mongo_n_plus_one_requests_total', 'Requisições acima do limite de comandos (provável N+1)', ['method', 'route'])
+
+# Comandos internos de handshake/monitoramento que não são queries da aplicação
+IGNORED_COMMANDS = frozenset(['hello', 'ismaster', 'isMaster', 'ping', 'saslStart', 'saslContinue', 'endSessions', 'buildinfo'])
+FILTER_KEYS = {'find': 'filter', 'count': 'query', 'distinct': 'query', 'findAndModify': 'query',
+               'delete': 'deletes', 'update': 'updates', 'aggregate': 'pipeline'}
+
+class RequestQueryStats:
+    """
+    Atualizada pelas threads do executor do Motor: queries concorrentes da mesma requisição
+    (asyncio.gather nos loaders) terminam em threads diferentes, daí o lock
+    """
+    __slots__ = ('count', 'total_ms', 'commands', '_lock')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.commands = CommandCounter()
+        self._lock = threading.Lock()
+
+    def add(self, command_name: str, duration_ms: float):
+        with self._lock:
+            self.count += 1
+            self.total_ms += duration_ms
+            self.commands[command_name] += 1
+
+_request_stats: contextvars.ContextVar = contextvars.ContextVar('mongo_request_stats', default=None)
+
+def current_query_stats():
+    return _request_stats.get()
+
+def filter_shape(value, depth: int = 0):
+    """Estrutura do filtro com os valores trocados pelo tipo (não loga dados de usuários)"""
+    if depth > 4:
+        return '...'
+    if isinstance(value, dict):
+        return {key: filter_shape(item, depth + 1) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(item, dict) for item in value):
+            return [filter_shape(item, depth + 1) for item in value[:3]]
+        return f'<list[{len(value)}]>'
+    return f'<{type(value).__name__}>'
+
+class CommandMonitor(monitoring.CommandListener):
+    def __init__(self, slow_ms: float):
+        self.slow_ms = slow_ms
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        command = event.command
+        key = FILTER_KEYS.get(event.command_name)
+        summary = (command.get(event.command_name), command.get(key) if key else None, time.perf_counter())
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = summary
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        with self._lock:
+            collection, query, started = self._pending.pop((event.connection_id, event.request_id), (None, None, None))
+        duration_ms = event.duration_micros / 1000
+        if started is not None:
+            record_span(f"mongo.{event.command_name}", started, started + duration_ms / 1000, collection=collection)
+
+        MONGO_COMMAND_LATENCY.observe(duration_ms / 1000, event.command_name)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.add(event.command_name, duration_ms)
+
+        if duration_ms >= self.slow_ms:
+            MONGO_SLOW_COMMANDS.inc(event.command_name, str(collection))
+            logger.warning(
+                f"Slow Mongo command: {event.command_name} on {collection} took {duration_ms:.1f}ms "
+                f"filter={filter_shape(query)}"
+            )
+
+class QueryCountMiddleware:
+    """
+    Conta os comandos do MongoDB de cada requisição e sinaliza prováveis N+1.
+    O header x-mongo-queries só conta os comandos feitos antes do envio dos headers: em
+    respostas em streaming (exports) os comandos do corpo ficam de fora. O histograma
+    mongo_queries_per_request e o aviso de N+1 são registrados no fim e contam todos
+    """
+
+    def __init__(self, app, n_plus_one_threshold: int = 20):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = _request_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                # Parcial em streaming: os comandos seguintes não cabem mais no header
+                message.setdefault('headers', [])
+                message['headers'] = list(message['headers']) + [(b'x-mongo-queries', str(stats.count).encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            method = scope['method']
+            route = route_template(scope)
+            MONGO_QUERIES_PER_REQUEST.observe(stats.count, method, route)
+            if stats.count > self.n_plus_one_threshold:
+                N_PLUS_ONE_REQUESTS.inc(method, route)
+                logger.warning(
+                    f"Possible N+1: {method} {route} issued {stats.count} Mongo commands "
+                    f"({stats.total_ms:.1f}ms) {dict(stats.commands)}"
+                )
+            else:
+                logger.debug(f"{method} {route}: {stats.count} Mongo commands ({stats.total_ms:.1f}ms)")
+
+MONGO_POOL_CONNECTIONS = Gauge('mongo_pool_connections', 'Conexões abertas no pool do MongoDB', ['address'])
+MONGO_POOL_CHECKED_OUT = Gauge('mongo_pool_checked_out', 'Conexões do pool em uso', ['address'])
+MONGO_POOL_MAX_SIZE = Gauge('mongo_pool_max_size', 'Tamanho máximo configurado do pool', ['address'])
+MONGO_POOL_CHECKOUT_WAIT = Histogram(
+    'mongo_pool_checkout_wait_seconds', 'Espera para obter uma conexão do pool', ['address'],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter('mongo_pool_checkout_failures_total', 'Falhas ao obter conexão do pool', ['address', 'reason'])
+MONGO_POOL_CLEARED = Counter('mongo_pool_cleared_total', 'Vezes em que o pool foi limpo (ex: erro de rede)', ['address'])
+
+def _address(event) -> str:
+    host, port = event.address
+    return f'{host}:{port}'
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Tamanho, uso e espera de checkout do pool de conexões. O checkout acontece de forma
+    síncrona na thread do executor, então o início da espera fica num thread-local
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def pool_created(self, event):
+        MONGO_POOL_MAX_SIZE.set(event.options.get('maxPoolSize', 0), _address(event))
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        MONGO_POOL_CLEARED.inc(_address(event))
+
+    def pool_closed(self, event):
+        address = _address(event)
+        MONGO_POOL_CONNECTIONS.set(0, address)
+        MONGO_POOL_CHECKED_OUT.set(0, address)
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.inc(_address(event))
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.dec(_address(event))
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def _checkout_finished(self, event):
+        started = getattr(self._local, 'started', None)
+        self._local.started = None
+        if started is not None:
+            MONGO_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started, _address(event))
+
+    def connection_check_out_failed(self, event):
+        self._checkout_finished(event)
+        MONGO_POOL_CHECKOUT_FAILURES.inc(_address(event), event.reason)
+        if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+            logger.warning(f"Mongo pool exhausted: checkout timed out on {_address(event)}")
+
+    def connection_checked_out(self, event):
+        self._checkout_finished(event)
+        MONGO_POOL_CHECKED_OUT.inc(_address(event))
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CHECKED_OUT.dec(_address(event))
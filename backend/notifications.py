@@ -0,0 +1,98 @@
+"""
+Notificações de novos pedidos de ajuda para voluntários compatíveis
+O fan-out roda num estágio em background: os destinatários saem do índice
+categoria -> voluntários e as notificações são gravadas em lotes com insert_many.
+A fila fica na memória do worker: no desligamento ela é esvaziada (drain), mas se o
+processo cair os fan-outs ainda pendentes se perdem (o post continua no feed)
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import List
+
+from pymongo import UpdateOne
+
+from matching import MatchingIndex
+
+logger = logging.getLogger(__name__)
+
+class NotificationFanout:
+    def __init__(self, index: MatchingIndex, batch_size: int = 500, queue_size: int = 10000):
+        self.index = index
+        self.batch_size = batch_size
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def submit(self, post: dict):
+        """Enfileira um post 'need' sem bloquear a requisição que o criou"""
+        try:
+            self.queue.put_nowait(post)
+        except asyncio.QueueFull:
+            logger.warning(f"Notification queue full, dropping fan-out for post {post['id']}")
+
+    async def run(self, db):
+        while True:
+            post = await self.queue.get()
+            try:
+                await self.fan_out(db, post)
+            except Exception as e:
+                logger.error(f"Notification fan-out failed for post {post['id']}: {str(e)}")
+            finally:
+                self.queue.task_done()
+
+    async def drain(self, timeout: float):
+        """Espera os fan-outs enfileirados terminarem, por até `timeout` segundos"""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Shutting down with {self.queue.qsize()} notification fan-outs pending")
+
+    def recipients(self, post: dict) -> List[str]:
+        # Quem não escolheu categorias vê todos os pedidos no feed, então é notificado de todos
+        recipients = self.index.by_category.get(post['category'], set()) | self.index.uncategorized
+        return [user_id for user_id in recipients if user_id != post['user_id']]
+
+    async def fan_out(self, db, post: dict) -> int:
+        recipients = self.recipients(post)
+        created_at = datetime.now(timezone.utc).isoformat()
+        for start in range(0, len(recipients), self.batch_size):
+            batch = recipients[start:start + self.batch_size]
+            await db.notifications.insert_many([
+                {
+                    'id': str(uuid.uuid4()),
+                    'user_id': user_id,
+                    'type': 'need_post',
+                    'post_id': post['id'],
+                    'from_user_id': post['user_id'],
+                    'category': post['category'],
+                    'title': post['title'],
+                    'read': False,
+                    'created_at': created_at
+                }
+                for user_id in batch
+            ], ordered=False)
+            await db.notification_counters.bulk_write([
+                UpdateOne({'user_id': user_id}, {'$inc': {'unread': 1}}, upsert=True)
+                for user_id in batch
+            ], ordered=False)
+        return len(recipients)
+
+async def remove_notifications(db, query: dict):
+    """Apaga as notificações do filtro, descontando as não lidas dos contadores"""
+    unread = db.notifications.aggregate([
+        {'$match': {**query, 'read': False}},
+        {'$group': {'_id': '$user_id', 'count': {'$sum': 1}}}
+    ])
+    ops = [UpdateOne({'user_id': row['_id']}, {'$inc': {'unread': -row['count']}}) async for row in unread]
+    if ops:
+        await db.notification_counters.bulk_write(ops, ordered=False)
+    await db.notifications.delete_many(query)
+
+async def remove_user_notifications(db, user_ids: List[str]):
+    """Cascata da exclusão de usuários: as notificações deles e as geradas pelos posts deles"""
+    await db.notifications.delete_many({'user_id': {'$in': user_ids}})
+    await db.notification_counters.delete_many({'user_id': {'$in': user_ids}})
+    await remove_notifications(db, {'from_user_id': {'$in': user_ids}})
+
+async def remove_post_notifications(db, post_ids: List[str]):
+    await remove_notifications(db, {'post_id': {'$in': post_ids}})
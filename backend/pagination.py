@@ -0,0 +1,42 @@
+"""
+Paginação por cursor (keyset) para listagens ordenadas por (created_at, id)
+O cursor é opaco para o cliente: base64 de um JSON com a chave do último item
+"""
+import base64
+import json
+from typing import Optional, Tuple
+
+def encode_cursor(created_at: str, item_id: str) -> str:
+    raw = json.dumps([created_at, item_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Levanta ValueError se o cursor não for válido"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(created_at, str) or not isinstance(item_id, str):
+        raise ValueError("Invalid cursor")
+    return created_at, item_id
+
+def keyset_filter(cursor: Optional[str]) -> dict:
+    """
+    Filtro para itens depois do cursor numa ordenação (created_at desc, id desc).
+    Usa $or no topo: para juntar a uma query existente use with_keyset
+    """
+    if not cursor:
+        return {}
+    created_at, item_id = decode_cursor(cursor)
+    return {'$or': [
+        {'created_at': {'$lt': created_at}},
+        {'created_at': created_at, 'id': {'$lt': item_id}}
+    ]}
+
+def with_keyset(query: dict, cursor: Optional[str]) -> dict:
+    """Acrescenta o filtro do cursor com $and, sem sobrescrever um $or que a query já tenha"""
+    cursor_filter = keyset_filter(cursor)
+    if cursor_filter:
+        query.setdefault('$and', []).append(cursor_filter)
+    return query
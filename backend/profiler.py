@@ -0,0 +1,136 @@
+"""
+Profiler por amostragem para o processo em produção
+Uma thread lê sys._current_frames() a intervalos fixos e acumula as pilhas no formato
+"collapsed" (frame;frame;frame N), compatível com flamegraph.pl / speedscope.
+Nada roda quando nenhum profile está ativo: a thread só existe durante a amostragem
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+PROFILE_CONTENT_TYPE = 'text/plain; charset=utf-8'
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def collapse_stack(frame, root_frame=None) -> Optional[str]:
+    """Pilha da raiz para a folha; com root_frame, só conta pilhas que passam por ele"""
+    labels = []
+    found = root_frame is None
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        if frame is root_frame:
+            found = True
+        frame = frame.f_back
+    if not found:
+        return None
+    labels.reverse()
+    return ';'.join(labels)
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005, root_frame=None):
+        self.interval = interval
+        self.root_frame = root_frame
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample_once(self, own_ident: int):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            stack = collapse_stack(frame, self.root_frame)
+            if stack is None:
+                continue
+            if self.root_frame is None:
+                stack = f"{names.get(ident, ident)};{stack}"
+            self.stacks[stack] += 1
+        self.samples += 1
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.is_set():
+            self._sample_once(own_ident)
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+_profile_lock = threading.Lock()
+
+def profile_process(seconds: float, interval: float = 0.005) -> Optional[str]:
+    """Amostra o processo inteiro por `seconds` (bloqueante); None se já há um profile rodando"""
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        profiler = SamplingProfiler(interval)
+        profiler.start()
+        time.sleep(seconds)
+        profiler.stop()
+        return profiler.collapsed()
+    finally:
+        _profile_lock.release()
+
+class RequestProfilerMiddleware:
+    """
+    Perfila uma única requisição quando ela traz o header X-Profile com o token configurado.
+    A resposta original é descartada e substituída pelas pilhas collapsed; o status original
+    vai no header X-Profiled-Status. Só é instalado quando PROFILER_TOKEN está definido
+    """
+
+    def __init__(self, app, token: str, interval: float = 0.001):
+        self.app = app
+        self.token = token.encode()
+        self.interval = interval
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or dict(scope['headers']).get(b'x-profile') != self.token:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def discard(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+
+        # O frame desta corrotina está na pilha sempre que a requisição está executando no loop,
+        # o que separa as amostras dela das de outras requisições concorrentes
+        profiler = SamplingProfiler(self.interval, root_frame=sys._getframe())
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.stop()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        body = profiler.collapsed().encode()
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', PROFILE_CONTENT_TYPE.encode()),
+                (b'content-length', str(len(body)).encode()),
+                (b'x-profiled-status', str(status_code).encode()),
+                (b'x-profile-samples', str(profiler.samples).encode()),
+                (b'x-profile-elapsed-ms', f'{elapsed_ms:.1f}'.encode()),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
@@ -1,29 +1,98 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from startup_report import STARTUP, lazy_import
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import StreamingResponse, PlainTextResponse, ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import BulkWriteError
 import os
+import asyncio
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
+from contextlib import asynccontextmanager
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, ValidationError, field_validator
 from typing import List, Optional
+import re
 import uuid
+import hashlib
+import orjson
 from datetime import datetime, timezone, timedelta
-import bcrypt
-import jwt
-from emergentintegrations.llm.chat import LlmChat, UserMessage
-from pdf_processor import WatizatPDFProcessor
+STARTUP.checkpoint('import framework')
 from auto_responses import get_auto_response, format_auto_response_post
+from exporter import (EXPORT_COLLECTIONS, EXPORT_FORMATS, parse_fields, build_projection,
+                      build_date_filter, stream_ndjson, stream_csv)
+from matching import MatchingIndex, PROFILE_PROJECTION
+from chat_permissions import CHAT_PERMISSIONS_VERSION_ID, ChatPermissionIndex, USER_PROJECTION
+from notifications import NotificationFanout, remove_post_notifications, remove_user_notifications
+from db_indexes import ensure_indexes
+from pagination import encode_cursor, with_keyset
+from geo import coords, haversine_km, bounding_box, to_point
+from metrics import REGISTRY, PROMETHEUS_CONTENT_TYPE, MetricsMiddleware
+from mongo_monitor import CommandMonitor, PoolMonitor, QueryCountMiddleware
+from loaders import LoaderMiddleware, RequestLoaders, current_loaders
+from cache import Cache, backend_from_env
+from feed_cache import FEED_VERSION_ID, FeedCache, visibility_bucket
+from versions import publish_change, watch_changes, watch_version
+from tracing import TraceStore, TracingMiddleware, span
+from profiler import PROFILE_CONTENT_TYPE, RequestProfilerMiddleware, profile_process
+from service_index import (ServiceClusterIndex, ServicesCatalog, etag_matches, fetch_services_version,
+                           bump_services_version, watch_services_version)
+STARTUP.checkpoint('import app modules')
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+command_monitor = CommandMonitor(slow_ms=float(os.environ.get('MONGO_SLOW_QUERY_MS', '100')))
+pool_monitor = PoolMonitor()
 
-app = FastAPI()
+# Criados no lifespan: um client por worker, depois do fork do main.py
+client: Optional[AsyncIOMotorClient] = None
+db = None
+
+def mongo_client_options() -> dict:
+    options = {
+        'maxPoolSize': int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+        'minPoolSize': int(os.environ.get('MONGO_MIN_POOL_SIZE', '10')),
+        'maxIdleTimeMS': int(os.environ.get('MONGO_MAX_IDLE_MS', '300000')),
+        'waitQueueTimeoutMS': int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '10000')),
+        'connectTimeoutMS': int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000')),
+        'serverSelectionTimeoutMS': int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+    }
+    if os.environ.get('MONGO_SOCKET_TIMEOUT_MS'):
+        options['socketTimeoutMS'] = int(os.environ['MONGO_SOCKET_TIMEOUT_MS'])
+    if os.environ.get('MONGO_COMPRESSORS'):
+        # ex: "zstd,zlib" (zstd exige o pacote zstandard)
+        options['compressors'] = os.environ['MONGO_COMPRESSORS']
+    return options
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global client, db
+    client = AsyncIOMotorClient(mongo_url, event_listeners=[command_monitor, pool_monitor], **mongo_client_options())
+    db = client[os.environ['DB_NAME']]
+    try:
+        with STARTUP.phase('mongo warmup'):
+            await warm_up_mongo()
+        await load_in_memory_indexes()
+        STARTUP.ready()
+        yield
+    finally:
+        # Redeploys não perdem os fan-outs já enfileirados
+        await notification_fanout.drain(NOTIFICATION_DRAIN_SECONDS)
+        for task in background_tasks:
+            task.cancel()
+        if REGISTRY.directory:
+            # Os contadores finais deste worker continuam na soma depois que ele sair
+            REGISTRY.write_snapshot()
+        await asyncio.to_thread(trace_store.close)
+        client.close()
+
+# orjson serializa datetimes e dicts direto em C; as rotas de listas grandes devolvem
+# ORJSONResponse explicitamente para pular também o jsonable_encoder do FastAPI
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 api_router = APIRouter(prefix="/api")
 
 @api_router.get("/")
@@ -34,7 +103,62 @@ security = HTTPBearer()
 JWT_SECRET = os.environ.get('JWT_SECRET', 'default_secret')
 ALGORITHM = "HS256"
 
-pdf_processor = WatizatPDFProcessor()
+USER_ROLES = ['migrant', 'volunteer', 'helper', 'admin']
+ADMIN_BULK_MAX_ITEMS = int(os.environ.get('ADMIN_BULK_MAX_ITEMS', '1000'))
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+MATCHING_INDEX_REFRESH_SECONDS = float(os.environ.get('MATCHING_INDEX_REFRESH_SECONDS', '300'))
+NOTIFICATION_BATCH_SIZE = int(os.environ.get('NOTIFICATION_BATCH_SIZE', '500'))
+NOTIFICATION_DRAIN_SECONDS = float(os.environ.get('NOTIFICATION_DRAIN_SECONDS', '10'))
+SERVICES_VERSION_POLL_SECONDS = float(os.environ.get('SERVICES_VERSION_POLL_SECONDS', '30'))
+FEED_VERSION_POLL_SECONDS = float(os.environ.get('FEED_VERSION_POLL_SECONDS', '1'))
+PROFILES_VERSION_POLL_SECONDS = float(os.environ.get('PROFILES_VERSION_POLL_SECONDS', '1'))
+CHAT_PERMISSIONS_VERSION_POLL_SECONDS = float(os.environ.get('CHAT_PERMISSIONS_VERSION_POLL_SECONDS', '1'))
+
+# O processador do guia e o SDK do LLM só são carregados quando o chat de IA é usado
+pdf_processor = None
+
+def get_pdf_processor():
+    global pdf_processor
+    if pdf_processor is None:
+        pdf_processor = lazy_import('pdf_processor').WatizatPDFProcessor()
+    return pdf_processor
+
+# Backend em memória é por worker: as invalidações abaixo só alcançam o próprio processo
+# (perfis e feed as propagam por versões em db.meta, os outros dependem de TTLs curtos);
+# com CACHE_BACKEND=redis o cache é compartilhado
+cache = Cache(backend_from_env(os.environ.get('CACHE_BACKEND', 'memory'), os.environ.get('CACHE_REDIS_URL')))
+profile_cache = cache.namespace('profiles', ttl=float(os.environ.get('PROFILE_CACHE_SECONDS', '60')), max_size=10000)
+admin_stats_cache = cache.namespace('admin_stats', ttl=float(os.environ.get('ADMIN_STATS_CACHE_SECONDS', '30')), max_size=1)
+feed_cache = FeedCache(cache.namespace('feed', ttl=float(os.environ.get('FEED_CACHE_SECONDS', '300')), max_size=1000))
+ai_answer_cache = cache.namespace('ai_answers', ttl=float(os.environ.get('AI_ANSWER_CACHE_SECONDS', '3600')), max_size=2000)
+
+PROFILES_VERSION_ID = 'profiles_version'
+
+async def drop_cached_profiles(user_ids):
+    for user_id in user_ids:
+        await profile_cache.delete(user_id)
+
+async def invalidate_profiles(user_ids):
+    """Apaga os perfis deste worker e avisa os outros (watch_changes no startup)"""
+    if not user_ids:
+        return
+    await drop_cached_profiles(user_ids)
+    try:
+        await publish_change(db, PROFILES_VERSION_ID, user_ids)
+    except Exception as e:
+        # Os outros workers ficam com o perfil antigo até o TTL
+        logger.error(f"Profile invalidation publish failed: {str(e)}")
+
+trace_store = TraceStore(
+    capacity=int(os.environ.get('TRACE_BUFFER_SIZE', '1000')),
+    export_path=os.environ.get('TRACE_EXPORT_PATH'),
+    export_min_ms=float(os.environ.get('TRACE_EXPORT_MIN_MS', '0'))
+)
+matching_index = MatchingIndex()
+chat_permissions = ChatPermissionIndex()
+notification_fanout = NotificationFanout(matching_index, batch_size=NOTIFICATION_BATCH_SIZE)
+service_clusters = ServiceClusterIndex()
+services_catalog = ServicesCatalog()
 
 class User(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -50,6 +174,27 @@ class User(BaseModel):
     categories: List[str] = Field(default_factory=list)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+def user_from_db(doc: dict) -> User:
+    """User a partir de um documento gravado pela própria API: sem revalidar (EmailStr etc)"""
+    if isinstance(doc.get('created_at'), str):
+        doc['created_at'] = datetime.fromisoformat(doc['created_at'])
+    return User.model_construct(**doc)
+
+class ProfileUpdate(BaseModel):
+    # None = campo não enviado; null explícito só é aceito em bio e location
+    name: Optional[str] = Field(default=None, min_length=1)
+    bio: Optional[str] = None
+    location: Optional[dict] = None
+    languages: Optional[List[str]] = None
+    categories: Optional[List[str]] = None
+
+    @field_validator('name', 'languages', 'categories')
+    @classmethod
+    def reject_null(cls, value):
+        if value is None:
+            raise ValueError("may not be null")
+        return value
+
 class UserRegister(BaseModel):
     email: EmailStr
     password: str
@@ -134,18 +279,21 @@ def create_token(user_id: str, email: str) -> str:
         'email': email,
         'exp': datetime.now(timezone.utc) + timedelta(days=30)
     }
+    jwt = lazy_import('jwt')
     return jwt.encode(payload, JWT_SECRET, algorithm=ALGORITHM)
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    jwt = lazy_import('jwt')
     try:
         token = credentials.credentials
         payload = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
         user_id = payload.get('user_id')
         
-        user = await db.users.find_one({'id': user_id}, {'_id': 0})
+        # Fica memorizado no loader da requisição: as rotas relêem o documento sem ir ao banco
+        user = await current_loaders(db).users.load(user_id)
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
-        return User(**user)
+        return user_from_db(dict(user))
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except Exception as e:
@@ -157,6 +305,7 @@ async def register(user_data: UserRegister):
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     
+    bcrypt = lazy_import('bcrypt')
     hashed_pw = bcrypt.hashpw(user_data.password.encode(), bcrypt.gensalt())
     
     user = User(
@@ -192,6 +341,9 @@ async def register(user_data: UserRegister):
         user_dict['help_categories'] = user_data.help_categories or []
     
     await db.users.insert_one(user_dict)
+    matching_index.upsert(user_dict)
+    chat_permissions.upsert_user(user_dict)
+    await chat_permissions.publish(db, [user.id])
     
     token = create_token(user.id, user.email)
     return {'token': token, 'user': user}
@@ -203,14 +355,12 @@ async def login(credentials: UserLogin):
     if not user_data:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
+    bcrypt = lazy_import('bcrypt')
     if not bcrypt.checkpw(credentials.password.encode(), user_data['password'].encode()):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     user_data.pop('password')
-    if isinstance(user_data['created_at'], str):
-        user_data['created_at'] = datetime.fromisoformat(user_data['created_at'])
-    
-    user = User(**user_data)
+    user = user_from_db(user_data)
     token = create_token(user.id, user.email)
     
     return {'token': token, 'user': user}
@@ -223,14 +373,24 @@ async def get_profile(current_user: User = Depends(get_current_user)):
 async def update_profile(updates: dict, current_user: User = Depends(get_current_user)):
     allowed_fields = ['name', 'bio', 'location', 'languages', 'categories']
     update_data = {k: v for k, v in updates.items() if k in allowed_fields}
+    # A validação fica na entrada do cliente; o documento relido abaixo é confiável
+    try:
+        update_data = ProfileUpdate(**update_data).model_dump(exclude_unset=True)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
     
     await db.users.update_one({'id': current_user.id}, {'$set': update_data})
     
     updated_user = await db.users.find_one({'id': current_user.id}, {'_id': 0, 'password': 0})
-    if isinstance(updated_user['created_at'], str):
-        updated_user['created_at'] = datetime.fromisoformat(updated_user['created_at'])
     
-    return User(**updated_user)
+    matching_index.upsert(updated_user)
+    chat_permissions.upsert_user(updated_user)
+    await chat_permissions.publish(db, [current_user.id])
+    await invalidate_profiles([current_user.id])
+    if 'name' in update_data:
+        # O nome do autor vai renderizado nas páginas do feed
+        await feed_cache.clear(db)
+    return user_from_db(updated_user)
 
 @api_router.post("/posts", response_model=Post)
 async def create_post(post_data: PostCreate, current_user: User = Depends(get_current_user)):
@@ -246,10 +406,17 @@ async def create_post(post_data: PostCreate, current_user: User = Depends(get_cu
     post_dict = post.model_dump()
     post_dict['created_at'] = post_dict['created_at'].isoformat()
     post_dict['images'] = post_data.images or []
+    geo_point = to_point(post_data.location)
+    if geo_point:
+        post_dict['geo'] = geo_point
     
     await db.posts.insert_one(post_dict)
+    await feed_cache.posts_changed(db, [(post_data.type, post_data.category)])
     
     if post_data.type == 'need':
+        chat_permissions.add_need_post(current_user.id, post_data.category)
+        await chat_permissions.publish(db, [current_user.id])
+        notification_fanout.submit(post_dict)
         auto_response = get_auto_response(post_data.category)
         if auto_response:
             message_data = {
@@ -266,6 +433,9 @@ async def create_post(post_data: PostCreate, current_user: User = Depends(get_cu
 
 @api_router.post("/posts/{post_id}/comments")
 async def add_comment(post_id: str, comment_data: PostCommentCreate, current_user: User = Depends(get_current_user)):
+    if not await current_loaders(db).posts.load(post_id):
+        raise HTTPException(status_code=404, detail="Post not found")
+    
     comment = PostComment(
         post_id=post_id,
         user_id=current_user.id,
@@ -281,17 +451,39 @@ async def add_comment(post_id: str, comment_data: PostCommentCreate, current_use
 @api_router.get("/posts/{post_id}/comments")
 async def get_comments(post_id: str):
     comments = await db.comments.find({'post_id': post_id}, {'_id': 0}).sort('created_at', 1).to_list(1000)
+    users = await current_loaders(db).users.load_many([comment['user_id'] for comment in comments])
     
-    for comment in comments:
+    for comment, user in zip(comments, users):
         if isinstance(comment['created_at'], str):
             comment['created_at'] = datetime.fromisoformat(comment['created_at'])
         
-        user = await db.users.find_one({'id': comment['user_id']}, {'_id': 0, 'password': 0, 'email': 0})
         if user:
             comment['user'] = {'name': user['name'], 'role': user['role']}
     
     return comments
 
+def prepare_feed_post(post: dict, author: Optional[dict], viewer_role: str, help_categories: List[str]) -> bool:
+    """Converte datas, anexa o autor e marca can_help; retorna False se o post não deve aparecer"""
+    if isinstance(post['created_at'], str):
+        post['created_at'] = datetime.fromisoformat(post['created_at'])
+    
+    if post['user_id'] == 'system':
+        post['user'] = {'name': 'Watizat Assistant', 'role': 'assistant'}
+    elif author:
+        display_name = author.get('display_name') if author.get('use_display_name') else author['name']
+        post['user'] = {'name': display_name, 'role': author['role']}
+    
+    # Se é voluntário ou helper e o post é do tipo "need" (precisa de ajuda)
+    # só mostrar se a categoria do post está nas categorias que ele pode ajudar
+    if viewer_role in ['volunteer', 'helper'] and post['type'] == 'need':
+        # Se não tem categorias definidas ou a categoria do post está nas dele
+        if help_categories and post['category'] not in help_categories:
+            return False
+    
+    # Posts de oferta, e qualquer post para migrantes e outros usuários, todos podem ver
+    post['can_help'] = True
+    return True
+
 @api_router.get("/posts")
 async def get_posts(type: Optional[str] = None, category: Optional[str] = None, current_user: User = Depends(get_current_user)):
     query = {}
@@ -300,58 +492,148 @@ async def get_posts(type: Optional[str] = None, category: Optional[str] = None,
     if category:
         query['category'] = category
     
-    posts = await db.posts.find(query, {'_id': 0}).sort('created_at', -1).to_list(100)
-    
     # Se o usuário é voluntário, filtrar posts baseado nas categorias que ele pode ajudar
-    user_data = await db.users.find_one({'id': current_user.id}, {'_id': 0})
+    # (o documento do usuário já está no loader, carregado pelo get_current_user)
+    loaders = current_loaders(db)
+    user_data = await loaders.users.load(current_user.id)
     user_help_categories = user_data.get('help_categories', []) if user_data else []
     
-    filtered_posts = []
-    for post in posts:
-        if isinstance(post['created_at'], str):
-            post['created_at'] = datetime.fromisoformat(post['created_at'])
+    async def render_page() -> bytes:
+        with span('posts.query'):
+            posts = await db.posts.find(query, {'_id': 0, 'geo': 0}).sort('created_at', -1).to_list(100)
         
-        if post['user_id'] == 'system':
-            post['user'] = {'name': 'Watizat Assistant', 'role': 'assistant'}
-        else:
-            user = await db.users.find_one({'id': post['user_id']}, {'_id': 0, 'password': 0, 'email': 0})
-            if user:
-                display_name = user.get('display_name') if user.get('use_display_name') else user['name']
-                post['user'] = {'name': display_name, 'role': user['role']}
-        
-        # Se é voluntário ou helper e o post é do tipo "need" (precisa de ajuda)
-        # só mostrar se a categoria do post está nas categorias que ele pode ajudar
-        if current_user.role in ['volunteer', 'helper']:
-            if post['type'] == 'need':
-                # Se não tem categorias definidas ou a categoria do post está nas dele
-                if not user_help_categories or post['category'] in user_help_categories:
-                    post['can_help'] = True
+        filtered_posts = []
+        with span('posts.enrich', posts=len(posts)):
+            author_ids = list({post['user_id'] for post in posts if post['user_id'] != 'system'})
+            authors = dict(zip(author_ids, await loaders.users.load_many(author_ids)))
+            for post in posts:
+                if prepare_feed_post(post, authors.get(post['user_id']), current_user.role, user_help_categories):
                     filtered_posts.append(post)
-            else:
-                # Posts de oferta (type='offer') todos podem ver
-                post['can_help'] = True
-                filtered_posts.append(post)
-        else:
-            # Migrantes e outros usuários veem todos os posts
-            post['can_help'] = True
-            filtered_posts.append(post)
+        return orjson.dumps(filtered_posts)
     
-    return filtered_posts
+    # Página pronta em cache por (tipo, categoria, faixa de visibilidade)
+    bucket = visibility_bucket(current_user.role, user_help_categories)
+    payload = await feed_cache.get_page(type, category, bucket, render_page)
+    return Response(content=payload, media_type='application/json')
 
 @api_router.get("/services")
-async def get_services(category: Optional[str] = None):
+async def get_services(request: Request, category: Optional[str] = None):
+    # Catálogo servido da memória, já serializado; clientes com o ETag atual recebem 304
+    payload, etag = services_catalog.get(category)
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload, media_type='application/json', headers=headers)
+
+@api_router.get("/services/clusters")
+async def get_service_clusters(bbox: str, zoom: int, category: Optional[str] = None):
+    """Marcadores pré-agrupados para o mapa; bbox = 'oeste,sul,leste,norte'"""
+    try:
+        west, south, east, north = (float(value) for value in bbox.split(','))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid bbox")
+    if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+        raise HTTPException(status_code=400, detail="Invalid bbox")
+    
+    markers = service_clusters.query((west, south, east, north), zoom, category)
+    return {'zoom': zoom, 'version': service_clusters.version, 'markers': markers}
+
+NEARBY_MAX_RADIUS_KM = 100
+
+def _geo_near_stage(lat: float, lng: float, radius_km: float, query: dict) -> dict:
+    if not coords({'lat': lat, 'lng': lng}):
+        raise HTTPException(status_code=400, detail="Invalid coordinates")
+    if radius_km <= 0 or radius_km > NEARBY_MAX_RADIUS_KM:
+        raise HTTPException(status_code=400, detail=f"radius_km must be between 0 and {NEARBY_MAX_RADIUS_KM}")
+    
+    return {'$geoNear': {
+        'near': {'type': 'Point', 'coordinates': [lng, lat]},
+        'key': 'geo',
+        'distanceField': 'distance_m',
+        'maxDistance': radius_km * 1000,
+        'spherical': True,
+        'query': query
+    }}
+
+def _distance_km(doc: dict):
+    doc['distance_km'] = round(doc.pop('distance_m') / 1000, 3)
+
+@api_router.get("/services/nearby")
+async def get_services_nearby(lat: float, lng: float, radius_km: float = 5, category: Optional[str] = None, limit: int = 50):
     query = {}
     if category:
         query['category'] = category
     
-    services = await db.services.find(query, {'_id': 0}).to_list(100)
+    services = await db.services.aggregate([
+        _geo_near_stage(lat, lng, radius_km, query),
+        {'$limit': max(1, min(limit, 200))},
+        {'$project': {'_id': 0, 'geo': 0}}
+    ]).to_list(None)
+    
+    for service in services:
+        _distance_km(service)
+    
     return services
 
+@api_router.get("/posts/nearby")
+async def get_posts_nearby(
+    lat: float,
+    lng: float,
+    radius_km: float = 5,
+    type: Optional[str] = None,
+    category: Optional[str] = None,
+    limit: int = 50,
+    current_user: User = Depends(get_current_user)
+):
+    query = {}
+    if type:
+        query['type'] = type
+    if category:
+        query['category'] = category
+    
+    # Mesma regra do feed: voluntários/helpers só veem pedidos nas suas categorias
+    loaders = current_loaders(db)
+    if current_user.role in ['volunteer', 'helper']:
+        user_data = await loaders.users.load(current_user.id)
+        help_categories = user_data.get('help_categories', []) if user_data else []
+        if help_categories:
+            query['$or'] = [{'type': {'$ne': 'need'}}, {'category': {'$in': help_categories}}]
+    
+    posts = await db.posts.aggregate([
+        _geo_near_stage(lat, lng, radius_km, query),
+        {'$limit': max(1, min(limit, 200))},
+        {'$project': {'_id': 0, 'geo': 0}}
+    ]).to_list(None)
+    
+    author_ids = {post['user_id'] for post in posts if post['user_id'] != 'system'}
+    authors = {user['id']: user for user in await loaders.users.load_many(author_ids) if user}
+    
+    for post in posts:
+        _distance_km(post)
+        if isinstance(post['created_at'], str):
+            post['created_at'] = datetime.fromisoformat(post['created_at'])
+        if post['user_id'] == 'system':
+            post['user'] = {'name': 'Watizat Assistant', 'role': 'assistant'}
+        elif post['user_id'] in authors:
+            user = authors[post['user_id']]
+            display_name = user.get('display_name') if user.get('use_display_name') else user['name']
+            post['user'] = {'name': display_name, 'role': user['role']}
+        post['can_help'] = True
+    
+    return posts
+
+def ai_answer_key(message_data: AIMessage) -> str:
+    # Perguntas iguais (ignorando caixa e espaços) no mesmo idioma têm a mesma resposta
+    normalized = ' '.join(message_data.message.lower().split())
+    return hashlib.sha256(f"{message_data.language}\x1f{normalized}".encode()).hexdigest()
+
 @api_router.post("/ai/chat")
 async def ai_chat(message_data: AIMessage, current_user: User = Depends(get_current_user)):
-    try:
-        pdf_processor.load_index()
-        relevant_chunks = pdf_processor.search(message_data.message, k=3)
+    async def ask_llm() -> dict:
+        with span('retrieval.search'):
+            processor = get_pdf_processor()
+            processor.load_index()
+            relevant_chunks = processor.search(message_data.message, k=3)
         
         context = "\n\n".join(relevant_chunks) if relevant_chunks else "Informação não encontrada no guia Watizat."
         
@@ -363,14 +645,21 @@ async def ai_chat(message_data: AIMessage, current_user: User = Depends(get_curr
         {context}
         """
         
-        chat = LlmChat(
+        llm = lazy_import('emergentintegrations.llm.chat')
+        chat = llm.LlmChat(
             api_key=os.environ['EMERGENT_LLM_KEY'],
             session_id=f"user_{current_user.id}",
             system_message=system_message
         ).with_model("openai", "gpt-5.1")
         
-        user_message = UserMessage(text=message_data.message)
-        response = await chat.send_message(user_message)
+        user_message = llm.UserMessage(text=message_data.message)
+        with span('llm.send_message', provider='openai', model='gpt-5.1'):
+            response = await chat.send_message(user_message)
+        return {'response': response, 'sources': relevant_chunks[:2] if relevant_chunks else []}
+    
+    try:
+        answer = await ai_answer_cache.get_or_load(ai_answer_key(message_data), ask_llm)
+        response = answer['response']
         
         chat_record = {
             'id': str(uuid.uuid4()),
@@ -380,9 +669,10 @@ async def ai_chat(message_data: AIMessage, current_user: User = Depends(get_curr
             'language': message_data.language,
             'created_at': datetime.now(timezone.utc).isoformat()
         }
-        await db.ai_chats.insert_one(chat_record)
+        with span('ai_chats.insert'):
+            await db.ai_chats.insert_one(chat_record)
         
-        return {'response': response, 'sources': relevant_chunks[:2] if relevant_chunks else []}
+        return answer
     
     except Exception as e:
         logging.error(f"AI Chat error: {str(e)}")
@@ -416,11 +706,43 @@ async def get_matches(current_user: User = Depends(get_current_user)):
     matches = await db.matches.find(query, {'_id': 0}).to_list(100)
     return matches
 
+@api_router.get("/matches/suggestions")
+async def get_match_suggestions(limit: int = 20, current_user: User = Depends(get_current_user)):
+    if current_user.role != 'migrant':
+        raise HTTPException(status_code=400, detail="Only migrants can get suggestions")
+    
+    limit = max(1, min(limit, 100))
+    migrant = await current_loaders(db).users.load(current_user.id)
+    need_posts = await db.posts.find(
+        {'user_id': current_user.id, 'type': 'need'},
+        {'_id': 0, 'category': 1, 'location': 1}
+    ).sort('created_at', -1).to_list(100)
+    
+    needs = set(migrant.get('need_categories') or [])
+    needs.update(post['category'] for post in need_posts)
+    
+    # Sem localização no perfil, usar a do pedido mais recente que tenha uma
+    location = migrant.get('location') or next((post['location'] for post in need_posts if post.get('location')), None)
+    
+    already_matched = set(await db.matches.distinct('helper_id', {'migrant_id': current_user.id}))
+    
+    return matching_index.rank(
+        needs,
+        migrant.get('languages') or [],
+        location=location,
+        limit=limit,
+        exclude=already_matched
+    )
+
 @api_router.get("/admin/stats")
 async def admin_stats(current_user: User = Depends(get_current_user)):
     if current_user.role != 'admin':
         raise HTTPException(status_code=403, detail="Admin only")
     
+    # Contagens toleram alguns segundos de defasagem: cache só por TTL, sem invalidação
+    return await admin_stats_cache.get_or_load('stats', compute_admin_stats)
+
+async def compute_admin_stats() -> dict:
     total_users = await db.users.count_documents({})
     total_posts = await db.posts.count_documents({})
     total_matches = await db.matches.count_documents({})
@@ -462,7 +784,7 @@ async def admin_get_users(current_user: User = Depends(get_current_user)):
         if isinstance(user.get('created_at'), str):
             user['created_at'] = datetime.fromisoformat(user['created_at'])
     
-    return users
+    return ORJSONResponse(users)
 
 @api_router.get("/admin/posts")
 async def admin_get_posts(current_user: User = Depends(get_current_user)):
@@ -470,16 +792,16 @@ async def admin_get_posts(current_user: User = Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Admin only")
     
     posts = await db.posts.find({}, {'_id': 0}).sort('created_at', -1).to_list(1000)
+    users = await current_loaders(db).users.load_many([post['user_id'] for post in posts])
     
-    for post in posts:
+    for post, user in zip(posts, users):
         if isinstance(post.get('created_at'), str):
             post['created_at'] = datetime.fromisoformat(post['created_at'])
         # Get user info
-        user = await db.users.find_one({'id': post['user_id']}, {'_id': 0, 'password': 0, 'email': 0})
         if user:
             post['user'] = {'name': user['name'], 'role': user['role']}
     
-    return posts
+    return ORJSONResponse(posts)
 
 @api_router.delete("/admin/users/{user_id}")
 async def admin_delete_user(user_id: str, current_user: User = Depends(get_current_user)):
@@ -493,10 +815,16 @@ async def admin_delete_user(user_id: str, current_user: User = Depends(get_curre
     result = await db.users.delete_one({'id': user_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    matching_index.remove(user_id)
+    chat_permissions.remove_user(user_id)
+    await chat_permissions.publish(db, [user_id])
+    await invalidate_profiles([user_id])
     
-    # Also delete user's posts and messages
+    # Also delete user's posts, messages and notifications
     await db.posts.delete_many({'user_id': user_id})
+    await remove_user_notifications(db, [user_id])
     await db.messages.delete_many({'$or': [{'from_user_id': user_id}, {'to_user_id': user_id}]})
+    await feed_cache.clear(db)
     
     return {'message': 'User deleted successfully'}
 
@@ -505,12 +833,17 @@ async def admin_delete_post(post_id: str, current_user: User = Depends(get_curre
     if current_user.role != 'admin':
         raise HTTPException(status_code=403, detail="Admin only")
     
-    result = await db.posts.delete_one({'id': post_id})
-    if result.deleted_count == 0:
+    deleted_post = await db.posts.find_one_and_delete({'id': post_id}, {'_id': 0, 'user_id': 1, 'type': 1, 'category': 1})
+    if not deleted_post:
         raise HTTPException(status_code=404, detail="Post not found")
+    if deleted_post.get('type') == 'need':
+        chat_permissions.remove_need_post(deleted_post['user_id'], deleted_post.get('category'))
+        await chat_permissions.publish(db, [deleted_post['user_id']])
+    await feed_cache.posts_changed(db, [(deleted_post.get('type'), deleted_post.get('category'))])
     
-    # Also delete comments
+    # Also delete comments and notifications
     await db.comments.delete_many({'post_id': post_id})
+    await remove_post_notifications(db, [post_id])
     
     return {'message': 'Post deleted successfully'}
 
@@ -520,15 +853,268 @@ async def admin_update_user_role(user_id: str, role_data: dict, current_user: Us
         raise HTTPException(status_code=403, detail="Admin only")
     
     new_role = role_data.get('role')
-    if new_role not in ['migrant', 'volunteer', 'helper', 'admin']:
+    if new_role not in USER_ROLES:
         raise HTTPException(status_code=400, detail="Invalid role")
     
     result = await db.users.update_one({'id': user_id}, {'$set': {'role': new_role}})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
+    updated_user = await db.users.find_one({'id': user_id}, {**PROFILE_PROJECTION, **USER_PROJECTION})
+    if updated_user:
+        matching_index.upsert(updated_user)
+        chat_permissions.upsert_user(updated_user)
+    await chat_permissions.publish(db, [user_id])
+    await invalidate_profiles([user_id])
+    await feed_cache.clear(db)
+    
     return {'message': 'Role updated successfully'}
 
+class AdminBulkUserAction(BaseModel):
+    user_id: str
+    action: str  # 'delete' ou 'set_role'
+    role: Optional[str] = None
+
+class AdminBulkUsersRequest(BaseModel):
+    actions: List[AdminBulkUserAction]
+
+class AdminBulkPostAction(BaseModel):
+    post_id: str
+    action: str = 'delete'
+
+class AdminBulkPostsRequest(BaseModel):
+    actions: List[AdminBulkPostAction]
+
+def _apply_bulk_write_errors(error: BulkWriteError, op_items: List[int], results: List[dict]):
+    """Marca como erro os itens cujas operações falharam no bulk_write"""
+    for write_error in error.details.get('writeErrors', []):
+        item = results[op_items[write_error['index']]]
+        item['status'] = 'error'
+        item['detail'] = write_error.get('errmsg', 'Write failed')
+
+@api_router.post("/admin/bulk/users")
+async def admin_bulk_users(bulk_data: AdminBulkUsersRequest, current_user: User = Depends(get_current_user)):
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    if len(bulk_data.actions) > ADMIN_BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {ADMIN_BULK_MAX_ITEMS} actions per request")
+    
+    # One lookup for every referenced user instead of one per action
+    requested_ids = list({item.user_id for item in bulk_data.actions})
+    existing_ids = set(await db.users.distinct('id', {'id': {'$in': requested_ids}}))
+    
+    results = []
+    ops = []
+    op_items = []  # índice em results de cada operação enviada
+    deleted_ids = set()
+    
+    for item in bulk_data.actions:
+        result = {'user_id': item.user_id, 'action': item.action, 'status': 'ok'}
+        results.append(result)
+        
+        if item.action not in ('delete', 'set_role'):
+            result.update(status='invalid', detail="Unknown action")
+        elif item.action == 'set_role' and item.role not in USER_ROLES:
+            result.update(status='invalid', detail="Invalid role")
+        elif item.action == 'delete' and item.user_id == current_user.id:
+            result.update(status='invalid', detail="Cannot delete yourself")
+        elif item.user_id not in existing_ids or item.user_id in deleted_ids:
+            result.update(status='not_found', detail="User not found")
+        elif item.action == 'delete':
+            deleted_ids.add(item.user_id)
+            ops.append(DeleteOne({'id': item.user_id}))
+            op_items.append(len(results) - 1)
+        else:
+            ops.append(UpdateOne({'id': item.user_id}, {'$set': {'role': item.role}}))
+            op_items.append(len(results) - 1)
+    
+    if ops:
+        try:
+            await db.users.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            _apply_bulk_write_errors(e, op_items, results)
+    
+    role_changed_ids = [r['user_id'] for r in results if r['action'] == 'set_role' and r['status'] == 'ok']
+    if role_changed_ids:
+        async for updated_user in db.users.find({'id': {'$in': role_changed_ids}}, {**PROFILE_PROJECTION, **USER_PROJECTION}):
+            matching_index.upsert(updated_user)
+            chat_permissions.upsert_user(updated_user)
+        await invalidate_profiles(role_changed_ids)
+    
+    # Cascade only for users that were actually deleted, one query per collection
+    cascade = {'posts': 0, 'comments': 0, 'messages': 0}
+    deleted_ids = [r['user_id'] for r in results if r['action'] == 'delete' and r['status'] == 'ok']
+    for user_id in deleted_ids:
+        matching_index.remove(user_id)
+        chat_permissions.remove_user(user_id)
+    if role_changed_ids or deleted_ids:
+        await chat_permissions.publish(db, role_changed_ids + deleted_ids)
+    await invalidate_profiles(deleted_ids)
+    if deleted_ids:
+        post_ids = await db.posts.distinct('id', {'user_id': {'$in': deleted_ids}})
+        if post_ids:
+            cascade['comments'] = (await db.comments.delete_many({'post_id': {'$in': post_ids}})).deleted_count
+        cascade['posts'] = (await db.posts.delete_many({'user_id': {'$in': deleted_ids}})).deleted_count
+        cascade['messages'] = (await db.messages.delete_many({'$or': [
+            {'from_user_id': {'$in': deleted_ids}},
+            {'to_user_id': {'$in': deleted_ids}}
+        ]})).deleted_count
+        await remove_user_notifications(db, deleted_ids)
+    if role_changed_ids or deleted_ids:
+        await feed_cache.clear(db)
+    
+    return {
+        'results': results,
+        'succeeded': sum(1 for r in results if r['status'] == 'ok'),
+        'failed': sum(1 for r in results if r['status'] != 'ok'),
+        'cascade': cascade
+    }
+
+@api_router.post("/admin/bulk/posts")
+async def admin_bulk_posts(bulk_data: AdminBulkPostsRequest, current_user: User = Depends(get_current_user)):
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    if len(bulk_data.actions) > ADMIN_BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {ADMIN_BULK_MAX_ITEMS} actions per request")
+    
+    requested_ids = list({item.post_id for item in bulk_data.actions})
+    existing_posts = {}
+    async for post in db.posts.find({'id': {'$in': requested_ids}}, {'_id': 0, 'id': 1, 'user_id': 1, 'type': 1, 'category': 1}):
+        existing_posts[post['id']] = post
+    
+    results = []
+    ops = []
+    op_items = []
+    deleted_ids = set()
+    
+    for item in bulk_data.actions:
+        result = {'post_id': item.post_id, 'action': item.action, 'status': 'ok'}
+        results.append(result)
+        
+        if item.action != 'delete':
+            result.update(status='invalid', detail="Unknown action")
+        elif item.post_id not in existing_posts or item.post_id in deleted_ids:
+            result.update(status='not_found', detail="Post not found")
+        else:
+            deleted_ids.add(item.post_id)
+            ops.append(DeleteOne({'id': item.post_id}))
+            op_items.append(len(results) - 1)
+    
+    if ops:
+        try:
+            await db.posts.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            _apply_bulk_write_errors(e, op_items, results)
+    
+    cascade = {'comments': 0}
+    deleted_ids = [r['post_id'] for r in results if r['status'] == 'ok']
+    need_authors = set()
+    for post_id in deleted_ids:
+        post = existing_posts[post_id]
+        if post.get('type') == 'need':
+            chat_permissions.remove_need_post(post['user_id'], post.get('category'))
+            need_authors.add(post['user_id'])
+    if need_authors:
+        await chat_permissions.publish(db, need_authors)
+    if deleted_ids:
+        cascade['comments'] = (await db.comments.delete_many({'post_id': {'$in': deleted_ids}})).deleted_count
+        await remove_post_notifications(db, deleted_ids)
+        await feed_cache.posts_changed(db, {
+            (existing_posts[post_id].get('type'), existing_posts[post_id].get('category')) for post_id in deleted_ids
+        })
+    
+    return {
+        'results': results,
+        'succeeded': sum(1 for r in results if r['status'] == 'ok'),
+        'failed': sum(1 for r in results if r['status'] != 'ok'),
+        'cascade': cascade
+    }
+
+@api_router.get("/admin/export/{collection}")
+async def admin_export(
+    collection: str,
+    format: str = 'ndjson',
+    fields: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    if collection not in EXPORT_COLLECTIONS:
+        raise HTTPException(status_code=404, detail="Unknown collection")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid format")
+    
+    selected_fields = parse_fields(fields, collection)
+    cursor = db[collection].find(
+        build_date_filter(since, until),
+        build_projection(collection, selected_fields)
+    ).batch_size(EXPORT_BATCH_SIZE)
+    
+    if format == 'csv':
+        body = stream_csv(cursor, selected_fields or EXPORT_COLLECTIONS[collection]['csv_fields'], EXPORT_BATCH_SIZE)
+    else:
+        body = stream_ndjson(cursor, EXPORT_BATCH_SIZE)
+    
+    filename = f"{collection}-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@api_router.post("/admin/services/reload")
+async def admin_reload_services(current_user: User = Depends(get_current_user)):
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    # Recarrega este worker agora; os demais percebem a nova versão no próximo poll
+    version = await bump_services_version(db)
+    await reload_services(version)
+    
+    return {'message': 'Services reloaded', 'version': version, 'total_services': len(services_catalog.services)}
+
+@api_router.get("/admin/traces")
+async def admin_get_traces(min_ms: float = 0, limit: int = 20, current_user: User = Depends(get_current_user)):
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    limit = max(1, min(limit, 200))
+    return [trace.to_dict() for trace in trace_store.recent(min_ms=min_ms, limit=limit)]
+
+@api_router.get("/admin/traces/{trace_id}")
+async def admin_get_trace(trace_id: str, current_user: User = Depends(get_current_user)):
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    trace = trace_store.get(trace_id)
+    if not trace:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace.to_dict()
+
+@api_router.get("/admin/startup")
+async def admin_startup_report(current_user: User = Depends(get_current_user)):
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    return STARTUP.to_dict()
+
+@api_router.get("/admin/profile")
+async def admin_profile(seconds: float = 10, interval_ms: float = 5, current_user: User = Depends(get_current_user)):
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    seconds = max(0.1, min(seconds, 60))
+    interval = max(0.001, min(interval_ms, 100)) / 1000
+    collapsed = await asyncio.to_thread(profile_process, seconds, interval)
+    if collapsed is None:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    return PlainTextResponse(collapsed, media_type=PROFILE_CONTENT_TYPE)
+
 class DirectMessage(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -574,123 +1160,208 @@ async def get_messages(other_user_id: str, current_user: User = Depends(get_curr
         if isinstance(msg['created_at'], str):
             msg['created_at'] = datetime.fromisoformat(msg['created_at'])
     
-    return messages
+    return ORJSONResponse(messages)
 
 @api_router.get("/conversations")
 async def get_conversations(current_user: User = Depends(get_current_user)):
-    messages = await db.messages.find({
-        '$or': [
-            {'from_user_id': current_user.id},
-            {'to_user_id': current_user.id}
-        ]
-    }, {'_id': 0}).to_list(10000)
-    
-    user_ids = set()
-    for msg in messages:
-        if msg['from_user_id'] != current_user.id:
-            user_ids.add(msg['from_user_id'])
-        if msg['to_user_id'] != current_user.id:
-            user_ids.add(msg['to_user_id'])
+    # Uma agregação: última mensagem de cada conversa, agrupada pelo outro participante
+    pipeline = [
+        {'$match': {'$or': [{'from_user_id': current_user.id}, {'to_user_id': current_user.id}]}},
+        {'$sort': {'created_at': -1}},
+        {'$group': {
+            '_id': {'$cond': [{'$eq': ['$from_user_id', current_user.id]}, '$to_user_id', '$from_user_id']},
+            'last_message': {'$first': '$message'},
+            'last_message_time': {'$first': '$created_at'}
+        }},
+        {'$match': {'_id': {'$ne': current_user.id}}},
+        {'$sort': {'last_message_time': -1}}
+    ]
+    last_messages = [row async for row in db.messages.aggregate(pipeline)]
     
     conversations = []
-    for uid in user_ids:
-        user = await db.users.find_one({'id': uid}, {'_id': 0, 'password': 0})
+    users = await current_loaders(db).users.load_many([row['_id'] for row in last_messages])
+    for last_msg, user in zip(last_messages, users):
         if user:
-            last_msg = await db.messages.find_one({
-                '$or': [
-                    {'from_user_id': current_user.id, 'to_user_id': uid},
-                    {'from_user_id': uid, 'to_user_id': current_user.id}
-                ]
-            }, {'_id': 0}, sort=[('created_at', -1)])
-            
+            user = dict(user)
             if isinstance(user.get('created_at'), str):
                 user['created_at'] = datetime.fromisoformat(user['created_at'])
             
             conversations.append({
                 'user': user,
-                'last_message': last_msg['message'] if last_msg else '',
-                'last_message_time': last_msg['created_at'] if last_msg else None
+                'last_message': last_msg['last_message'] or '',
+                'last_message_time': last_msg['last_message_time']
             })
     
     return conversations
 
+@api_router.get("/notifications")
+async def get_notifications(limit: int = 50, before: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    query = {'user_id': current_user.id}
+    if before:
+        query['created_at'] = {'$lt': before}
+    
+    limit = max(1, min(limit, 100))
+    notifications = await db.notifications.find(query, {'_id': 0}).sort('created_at', -1).to_list(limit)
+    
+    for notification in notifications:
+        if isinstance(notification['created_at'], str):
+            notification['created_at'] = datetime.fromisoformat(notification['created_at'])
+    
+    return notifications
+
+@api_router.get("/notifications/unread-count")
+async def get_unread_notifications_count(current_user: User = Depends(get_current_user)):
+    counter = await db.notification_counters.find_one({'user_id': current_user.id}, {'_id': 0, 'unread': 1})
+    return {'unread': max(0, counter['unread']) if counter else 0}
+
+class NotificationsRead(BaseModel):
+    ids: Optional[List[str]] = None
+
+@api_router.post("/notifications/read")
+async def mark_notifications_read(read_data: NotificationsRead, current_user: User = Depends(get_current_user)):
+    """Marca como lidas as notificações em 'ids', ou todas se 'ids' não for enviado"""
+    ids = read_data.ids
+    query = {'user_id': current_user.id, 'read': False}
+    if ids is not None:
+        query['id'] = {'$in': ids}
+    
+    result = await db.notifications.update_many(query, {'$set': {'read': True}})
+    
+    if ids is None:
+        await db.notification_counters.update_one({'user_id': current_user.id}, {'$set': {'unread': 0}})
+    elif result.modified_count:
+        await db.notification_counters.update_one({'user_id': current_user.id}, {'$inc': {'unread': -result.modified_count}})
+    
+    return {'marked_read': result.modified_count}
+
 @api_router.get("/users/{user_id}")
 async def get_user_by_id(user_id: str, current_user: User = Depends(get_current_user)):
-    user = await db.users.find_one({'id': user_id}, {'_id': 0, 'password': 0})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    if isinstance(user.get('created_at'), str):
-        user['created_at'] = datetime.fromisoformat(user['created_at'])
+    async def load_profile():
+        user = await current_loaders(db).users.load(user_id)
+        if not user:
+            # Exceção não vai para o cache: um usuário criado depois aparece na hora
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        user = dict(user)
+        if isinstance(user.get('created_at'), str):
+            user['created_at'] = datetime.fromisoformat(user['created_at'])
+        return user
     
-    return user
+    # O dict em cache é compartilhado: só é serializado, nunca alterado
+    return ORJSONResponse(await profile_cache.get_or_load(user_id, load_profile))
 
 @api_router.get("/can-chat/{other_user_id}")
 async def can_chat_with_user(other_user_id: str, current_user: User = Depends(get_current_user)):
     """
     Verifica se o usuário atual pode iniciar chat com outro usuário.
     Para voluntários e helpers, só podem conversar com migrantes se tiverem categorias de ajuda compatíveis.
+    As categorias (incluindo as dos posts 'need' do migrante) ficam em bitmasks pré-calculadas.
     """
-    other_user = await db.users.find_one({'id': other_user_id}, {'_id': 0})
-    if not other_user:
+    # Os dois ensure() na mesma volta do loop: quem não está no índice sai numa única query
+    load_user = current_loaders(db).users.load
+    other_masks, current_masks = await asyncio.gather(
+        chat_permissions.ensure(db, other_user_id, load_user),
+        chat_permissions.ensure(db, current_user.id, load_user)
+    )
+    if not other_masks or not current_masks:
         raise HTTPException(status_code=404, detail="User not found")
     
-    current_user_data = await db.users.find_one({'id': current_user.id}, {'_id': 0})
-    
-    # Migrantes podem conversar com qualquer voluntário ou helper
-    if current_user.role == 'migrant':
-        return {'can_chat': True, 'reason': 'allowed'}
-    
-    # Voluntários e helpers só podem conversar com migrantes se tiverem categorias compatíveis
-    if current_user.role in ['volunteer', 'helper'] and other_user.get('role') == 'migrant':
-        helper_categories = current_user_data.get('help_categories', []) if current_user_data else []
-        
-        if not helper_categories:
-            # Se não definiu categorias, permitir chat (legacy)
-            return {'can_chat': True, 'reason': 'no_categories_defined'}
-        
-        # Primeiro verificar need_categories do migrante
-        migrant_need_categories = other_user.get('need_categories', [])
-        
-        if migrant_need_categories:
-            # Verificar match entre need_categories do migrante e help_categories
-            for cat in migrant_need_categories:
-                if cat in helper_categories:
-                    return {'can_chat': True, 'reason': 'category_match', 'matching_category': cat}
-        
-        # Se migrante não tem need_categories, verificar pelos posts
-        migrant_posts = await db.posts.find({'user_id': other_user_id, 'type': 'need'}, {'_id': 0}).to_list(100)
-        
-        if not migrant_posts and not migrant_need_categories:
-            # Se o migrante não tem posts nem need_categories, permitir chat
-            return {'can_chat': True, 'reason': 'no_needs_defined'}
-        
-        # Verificar se há algum post do migrante em categoria que pode ajudar
-        for post in migrant_posts:
-            if post.get('category') in helper_categories:
-                return {'can_chat': True, 'reason': 'category_match', 'matching_category': post.get('category')}
-        
-        return {'can_chat': False, 'reason': 'no_matching_categories'}
-    
-    # Outros casos: permitir
-    return {'can_chat': True, 'reason': 'allowed'}
+    return chat_permissions.can_chat(current_user.id, current_masks, other_user_id, other_masks)
+
+# Apenas o que o card do diretório mostra (sem email, telefone, bio etc.)
+VOLUNTEER_CARD_PROJECTION = {
+    '_id': 0, 'id': 1, 'name': 1, 'display_name': 1, 'use_display_name': 1, 'role': 1,
+    'professional_area': 1, 'professional_specialties': 1, 'availability': 1, 'languages': 1,
+    'help_categories': 1, 'organization': 1, 'years_experience': 1, 'education': 1,
+    'certifications': 1, 'professional_id': 1, 'location': 1, 'created_at': 1
+}
 
 @api_router.get("/volunteers")
-async def get_volunteers(area: Optional[str] = None):
+async def get_volunteers(
+    area: Optional[str] = None,
+    category: Optional[str] = None,
+    language: Optional[str] = None,
+    specialty: Optional[str] = None,
+    search: Optional[str] = Query(default=None, max_length=100),
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    radius_km: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50
+):
     query = {'role': 'volunteer'}
     if area:
         query['professional_area'] = area
+    if category:
+        query['help_categories'] = category
+    if language:
+        query['languages'] = language
+    if specialty:
+        query['professional_specialties'] = specialty
+    if search and search.strip():
+        # Busca parcial, sem diferenciar maiúsculas, no nome ou nas especialidades
+        pattern = {'$regex': re.escape(search.strip()), '$options': 'i'}
+        query['$or'] = [{'name': pattern}, {'professional_specialties': pattern}]
+    
+    origin = None
+    if lat is not None and lng is not None and radius_km:
+        origin = (lat, lng)
+        # Bounding box no índice, distância exata calculada abaixo
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+        query['location.lat'] = {'$gte': min_lat, '$lte': max_lat}
+        query['location.lng'] = {'$gte': min_lng, '$lte': max_lng}
     
-    volunteers = await db.users.find(query, {'_id': 0, 'password': 0, 'email': 0}).to_list(1000)
+    try:
+        # $and: a busca por nome também usa $or
+        with_keyset(query, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    limit = max(1, min(limit, 100))
+    db_cursor = db.users.find(query, VOLUNTEER_CARD_PROJECTION).sort([('created_at', -1), ('id', -1)]).batch_size(limit + 1)
+    
+    volunteers = []
+    has_more = False
+    async for vol in db_cursor:
+        location = vol.pop('location', None)
+        if origin:
+            vol_coords = coords(location)
+            if not vol_coords:
+                continue
+            distance_km = haversine_km(origin[0], origin[1], vol_coords[0], vol_coords[1])
+            if distance_km > radius_km:
+                continue
+            vol['distance_km'] = round(distance_km, 2)
+        if len(volunteers) == limit:
+            has_more = True
+            break
+        volunteers.append(vol)
+    await db_cursor.close()
+    
+    next_cursor = None
+    if has_more:
+        last = volunteers[-1]
+        next_cursor = encode_cursor(last['created_at'], last['id'])
     
     for vol in volunteers:
         if isinstance(vol.get('created_at'), str):
             vol['created_at'] = datetime.fromisoformat(vol['created_at'])
     
-    return volunteers
+    return ORJSONResponse({'volunteers': volunteers, 'next_cursor': next_cursor})
 
 app.include_router(api_router)
 
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+METRICS_EXPORT_SECONDS = float(os.environ.get('METRICS_EXPORT_SECONDS', '5'))
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    # Opcionalmente protegido por token quando o endpoint fica exposto publicamente
+    if METRICS_TOKEN and request.headers.get('authorization') != f'Bearer {METRICS_TOKEN}':
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    # Com vários workers lê os snapshots dos outros processos do disco
+    return Response(content=await asyncio.to_thread(REGISTRY.render_all), media_type=PROMETHEUS_CONTENT_TYPE)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -698,6 +1369,22 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(LoaderMiddleware, factory=lambda: RequestLoaders(db))
+app.add_middleware(QueryCountMiddleware, n_plus_one_threshold=int(os.environ.get('N_PLUS_ONE_THRESHOLD', '20')))
+# Toda requisição é medida; acima de TRACE_SLOW_MS o trace sempre fica, abaixo só 1% por padrão
+app.add_middleware(
+    TracingMiddleware,
+    store=trace_store,
+    sample_rate=float(os.environ.get('TRACE_SAMPLE_RATE', '0.01')),
+    slow_ms=float(os.environ.get('TRACE_SLOW_MS', '500'))
+)
+
+# Profiling por requisição (header X-Profile: <token>); sem token o middleware nem é instalado
+PROFILER_TOKEN = os.environ.get('PROFILER_TOKEN')
+if PROFILER_TOKEN:
+    app.add_middleware(RequestProfilerMiddleware, token=PROFILER_TOKEN)
+# Adicionado por último = mais externo: mede também o tempo do CORS
+app.add_middleware(MetricsMiddleware)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -705,6 +1392,55 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+background_tasks = []
+
+async def reload_services(version: int):
+    services = await db.services.find({}, {'_id': 0, 'geo': 0}).to_list(None)
+    services_catalog.load(services, version)
+    # Construir os clusters de todos os zooms fora do event loop
+    await asyncio.to_thread(service_clusters.rebuild, services, version)
+
+async def on_services_version_change(version: int):
+    if version != services_catalog.version:
+        await reload_services(version)
+
+async def warm_up_mongo():
+    # Falha cedo se o banco estiver inacessível e abre as conexões mínimas do pool antes da
+    # primeira requisição (pings concorrentes obrigam o pool a criar conexões em paralelo)
+    await db.command('ping')
+    min_pool_size = client.options.pool_options.min_pool_size
+    if min_pool_size > 1:
+        await asyncio.gather(*(db.command('ping') for _ in range(min_pool_size)))
+
+async def load_in_memory_indexes():
+    with STARTUP.phase('ensure indexes'):
+        await ensure_indexes(db)
+    with STARTUP.phase('matching index'):
+        await matching_index.load(db)
+    with STARTUP.phase('chat permissions index'):
+        await chat_permissions.load(db)
+    # O main.py já pode ter pré-carregado o catálogo antes do fork: só recarrega se mudou
+    with STARTUP.phase('services catalog'):
+        await on_services_version_change(await fetch_services_version(db))
+    await feed_cache.load_version(db)
+    for index in (matching_index, chat_permissions):
+        background_tasks.append(asyncio.create_task(
+            index.refresh_forever(db, MATCHING_INDEX_REFRESH_SECONDS)
+        ))
+    background_tasks.append(asyncio.create_task(notification_fanout.run(db)))
+    if REGISTRY.directory:
+        background_tasks.append(asyncio.create_task(REGISTRY.export_forever(METRICS_EXPORT_SECONDS)))
+    background_tasks.append(asyncio.create_task(
+        watch_services_version(db, on_services_version_change, SERVICES_VERSION_POLL_SECONDS)
+    ))
+    background_tasks.append(asyncio.create_task(
+        watch_version(db, FEED_VERSION_ID, feed_cache.on_version_change, FEED_VERSION_POLL_SECONDS)
+    ))
+    background_tasks.append(asyncio.create_task(watch_changes(
+        db, PROFILES_VERSION_ID, drop_cached_profiles, profile_cache.clear, PROFILES_VERSION_POLL_SECONDS
+    )))
+    background_tasks.append(asyncio.create_task(watch_version(
+        db, CHAT_PERMISSIONS_VERSION_ID, lambda version: chat_permissions.sync(db), CHAT_PERMISSIONS_VERSION_POLL_SECONDS
+    )))
+
+STARTUP.checkpoint('module init')
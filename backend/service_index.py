@@ -0,0 +1,186 @@
+"""
+Índices em memória do diretório de serviços
+A coleção services só muda por scripts de carga; eles incrementam a versão em
+db.meta e cada worker reconstrói seus índices quando percebe a versão nova
+"""
+import hashlib
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+from geo import coords, mercator
+from versions import bump_version, fetch_version, watch_version
+
+logger = logging.getLogger(__name__)
+
+SERVICES_VERSION_ID = 'services_version'
+
+async def fetch_services_version(db) -> int:
+    return await fetch_version(db, SERVICES_VERSION_ID)
+
+async def bump_services_version(db) -> int:
+    """Chamado por quem altera a coleção services, para os workers recarregarem"""
+    return await bump_version(db, SERVICES_VERSION_ID)
+
+class ServicesCatalog:
+    """Catálogo completo em memória, indexado por categoria e já serializado em JSON"""
+
+    def __init__(self):
+        self.services: List[dict] = []
+        self.by_category: Dict[str, List[dict]] = {}
+        self.payloads: Dict[Optional[str], Tuple[bytes, str]] = {}
+        self.version = None
+        self.loaded = False
+
+    @staticmethod
+    def _render(services: List[dict]) -> Tuple[bytes, str]:
+        payload = orjson.dumps(services, default=str)
+        etag = '"' + hashlib.sha256(payload).hexdigest()[:32] + '"'
+        return payload, etag
+
+    def load(self, services: List[dict], version: Optional[int] = None):
+        by_category = defaultdict(list)
+        for service in services:
+            by_category[service.get('category')].append(service)
+        payloads = {None: self._render(services)}
+        for category, category_services in by_category.items():
+            payloads[category] = self._render(category_services)
+        self.services = services
+        self.by_category = dict(by_category)
+        self.payloads = payloads
+        self.version = version
+        self.loaded = True
+        logger.info(f"Services catalog loaded with {len(services)} services")
+
+    def get(self, category: Optional[str] = None) -> Tuple[bytes, str]:
+        """(JSON serializado, ETag forte) da lista de serviços da categoria"""
+        payload = self.payloads.get(category)
+        if payload is None:
+            payload = self._render([])
+        return payload
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Compara If-None-Match com o ETag (comparação fraca, como manda o RFC 9110)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+# Clustering em grade: em cada zoom, pontos a menos de CLUSTER_RADIUS_PX pixels
+# (tiles de TILE_SIZE px) caem na mesma célula e viram um marcador só
+MAX_ZOOM = 18
+CLUSTER_RADIUS_PX = 60
+TILE_SIZE = 256
+
+class _ZoomLevel:
+    __slots__ = ('cell_size', 'cells')
+
+    def __init__(self, cell_size: float):
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], dict] = {}
+
+class _ClusterTree:
+    """Células pré-agregadas de um conjunto de pontos, para todos os zooms"""
+
+    def __init__(self, points: List[dict]):
+        self.levels = []
+        for zoom in range(MAX_ZOOM + 1):
+            level = _ZoomLevel(CLUSTER_RADIUS_PX / (TILE_SIZE * 2 ** zoom))
+            cells = defaultdict(list)
+            for point in points:
+                cells[(int(point['x'] / level.cell_size), int(point['y'] / level.cell_size))].append(point)
+            for key, members in cells.items():
+                level.cells[key] = self._marker(members)
+            self.levels.append(level)
+
+    @staticmethod
+    def _marker(members: List[dict]) -> dict:
+        if len(members) == 1:
+            point = members[0]
+            return {
+                'type': 'service',
+                'id': point['id'],
+                'name': point['name'],
+                'category': point['category'],
+                'lat': point['lat'],
+                'lng': point['lng'],
+            }
+        return {
+            'type': 'cluster',
+            'count': len(members),
+            'lat': sum(p['lat'] for p in members) / len(members),
+            'lng': sum(p['lng'] for p in members) / len(members),
+            'categories': dict(Counter(p['category'] for p in members)),
+        }
+
+    def query(self, zoom: int, min_x: float, min_y: float, max_x: float, max_y: float) -> List[dict]:
+        level = self.levels[zoom]
+        x0, x1 = int(min_x / level.cell_size), int(max_x / level.cell_size)
+        y0, y1 = int(min_y / level.cell_size), int(max_y / level.cell_size)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) < len(level.cells):
+            markers = []
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    marker = level.cells.get((cx, cy))
+                    if marker:
+                        markers.append(marker)
+            return markers
+        return [marker for (cx, cy), marker in level.cells.items() if x0 <= cx <= x1 and y0 <= cy <= y1]
+
+class ServiceClusterIndex:
+    def __init__(self):
+        self.trees: Dict[Optional[str], _ClusterTree] = {None: _ClusterTree([])}
+        self.version = None
+
+    def rebuild(self, services: List[dict], version: Optional[int] = None):
+        points = []
+        for service in services:
+            point = coords(service.get('location'))
+            if not point:
+                continue
+            x, y = mercator(*point)
+            points.append({
+                'id': service['id'],
+                'name': service.get('name'),
+                'category': service.get('category'),
+                'lat': point[0],
+                'lng': point[1],
+                'x': x,
+                'y': y,
+            })
+        by_category = defaultdict(list)
+        for point in points:
+            by_category[point['category']].append(point)
+        trees = {None: _ClusterTree(points)}
+        for category, category_points in by_category.items():
+            trees[category] = _ClusterTree(category_points)
+        self.trees = trees
+        self.version = version
+        logger.info(f"Service clusters rebuilt with {len(points)} located services")
+
+    def query(self, bbox: Tuple[float, float, float, float], zoom: int, category: Optional[str] = None) -> List[dict]:
+        """bbox = (oeste, sul, leste, norte) em graus"""
+        tree = self.trees.get(category)
+        if tree is None:
+            return []
+        west, south, east, north = bbox
+        zoom = max(0, min(MAX_ZOOM, zoom))
+        min_x, max_y = mercator(south, west)
+        max_x, min_y = mercator(north, east)
+        if west > east:
+            # bbox cruzando o antimeridiano
+            return tree.query(zoom, min_x, min_y, 1.0, max_y) + tree.query(zoom, 0.0, min_y, max_x, max_y)
+        return tree.query(zoom, min_x, min_y, max_x, max_y)
+
+async def watch_services_version(db, on_change, interval: float):
+    """Verifica periodicamente a versão dos serviços e chama on_change(version) quando muda"""
+    await watch_version(db, SERVICES_VERSION_ID, on_change, interval)
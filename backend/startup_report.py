@@ -0,0 +1,73 @@
+"""
+Relatório de tempo de startup
+Marca o custo de cada bloco de imports e das fases de inicialização (lifespan) e das
+dependências pesadas importadas sob demanda na primeira requisição que precisa delas
+"""
+import importlib
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+class StartupReport:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last_checkpoint = self.started
+        self.phases = []
+        self.lazy_imports = []
+        self.ready_ms = None
+
+    def _add(self, name: str, ms: float):
+        self.phases.append({'phase': name, 'ms': round(ms, 2), 'pid': os.getpid()})
+
+    def checkpoint(self, name: str):
+        """Registra o tempo desde o checkpoint anterior (blocos de import/inicialização do módulo)"""
+        now = time.perf_counter()
+        self._add(name, (now - self._last_checkpoint) * 1000)
+        self._last_checkpoint = now
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(name, (time.perf_counter() - started) * 1000)
+
+    def ready(self):
+        # Com o prefork do main.py, inclui o tempo do mestre antes do fork
+        self.ready_ms = round((time.perf_counter() - self.started) * 1000, 2)
+        slowest = sorted(self.phases, key=lambda p: p['ms'], reverse=True)[:5]
+        summary = ', '.join(f"{p['phase']}={p['ms']:.0f}ms" for p in slowest)
+        logger.info(f"Startup ready in {self.ready_ms:.0f}ms (pid {os.getpid()}): {summary}")
+
+    def to_dict(self) -> dict:
+        return {
+            'pid': os.getpid(),
+            'ready_ms': self.ready_ms,
+            'phases': self.phases,
+            'lazy_imports': self.lazy_imports,
+        }
+
+STARTUP = StartupReport()
+
+def lazy_import(name: str):
+    """Importa o módulo na primeira chamada (registrando o custo); depois é só um lookup"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    ms = (time.perf_counter() - started) * 1000
+    STARTUP.lazy_imports.append({
+        'module': name,
+        'ms': round(ms, 2),
+        'pid': os.getpid(),
+        'imported_at': datetime.now(timezone.utc).isoformat(),
+    })
+    logger.info(f"Lazy import of {name} took {ms:.0f}ms")
+    return module
@@ -0,0 +1,249 @@
+"""
+Tracing leve por requisição
+Cada requisição HTTP vira um trace com spans aninhados (Mongo, busca no guia, LLM...).
+Traces finalizados ficam num ring buffer em memória e, opcionalmente, num arquivo JSONL
+gravado por uma thread de exportação (serialização e escrita fora do event loop)
+"""
+import contextvars
+import itertools
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from metrics import Counter, route_template
+
+logger = logging.getLogger(__name__)
+
+TRACES_DROPPED = Counter('traces_export_dropped_total', 'Traces não exportados porque a fila de exportação estava cheia')
+
+class Span:
+    __slots__ = ('span_id', 'parent_id', 'name', 'start', 'end', 'attributes')
+
+    def __init__(self, span_id: int, parent_id: Optional[int], name: str, start: float, attributes: dict):
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.start = start
+        self.end = None
+        self.attributes = attributes
+
+class Trace:
+    def __init__(self, name: str):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.started_at = datetime.now(timezone.utc)
+        self.start = time.perf_counter()
+        self.end = None
+        self.spans: List[Span] = []
+        self._ids = itertools.count(1)
+        # Spans do Mongo chegam das threads do executor (record_span), em paralelo ao event loop
+        self._lock = threading.Lock()
+
+    def new_span(self, name: str, parent_id: Optional[int], start: float, attributes: dict) -> Span:
+        with self._lock:
+            span = Span(next(self._ids), parent_id, name, start, attributes)
+            self.spans.append(span)
+        return span
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+    def waterfall(self, width: int = 40) -> List[dict]:
+        """Spans em ordem de início, com profundidade, deslocamento e uma barra proporcional"""
+        total = max(self.duration_ms, 1e-6)
+        depths = {}
+        rows = []
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: (s.start, s.span_id))
+        for span in spans:
+            depth = depths.get(span.parent_id, -1) + 1
+            depths[span.span_id] = depth
+            offset_ms = (span.start - self.start) * 1000
+            duration_ms = ((span.end or self.end or span.start) - span.start) * 1000
+            bar_start = min(width - 1, int(offset_ms / total * width))
+            bar_length = max(1, round(duration_ms / total * width))
+            rows.append({
+                'span': span.name,
+                'depth': depth,
+                'offset_ms': round(offset_ms, 3),
+                'duration_ms': round(duration_ms, 3),
+                'attributes': span.attributes,
+                'bar': ' ' * bar_start + '█' * min(bar_length, width - bar_start),
+            })
+        return rows
+
+    def to_dict(self, include_waterfall: bool = True) -> dict:
+        data = {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'started_at': self.started_at.isoformat(),
+            # Com vários workers cada um tem seu buffer; o pid diz de qual veio
+            'pid': os.getpid(),
+            'duration_ms': round(self.duration_ms, 3),
+            'span_count': len(self.spans),
+        }
+        if include_waterfall:
+            data['waterfall'] = self.waterfall()
+        return data
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar('current_trace', default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar('current_span', default=None)
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+@contextmanager
+def span(name: str, **attributes):
+    """Abre um span filho do span atual; sem trace ativo não faz nada"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _current_span.get()
+    current = trace.new_span(name, parent.span_id if parent else None, time.perf_counter(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+
+def record_span(name: str, start: float, end: float, **attributes):
+    """Registra um span já medido (ex: comandos do Mongo vindos do CommandListener)"""
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    parent = _current_span.get()
+    recorded = trace.new_span(name, parent.span_id if parent else None, start, attributes)
+    recorded.end = end
+
+class TraceStore:
+    def __init__(self, capacity: int = 1000, export_path: Optional[str] = None, export_min_ms: float = 0,
+                 export_queue_size: int = 10000):
+        self.traces = deque(maxlen=capacity)
+        self.export_path = export_path
+        self.export_min_ms = export_min_ms
+        self._export_queue: queue.Queue = queue.Queue(maxsize=export_queue_size)
+        self._exporter: Optional[threading.Thread] = None
+        self._exporter_pid = None
+
+    def add(self, trace: Trace):
+        self.traces.append(trace)
+        if self.export_path and trace.duration_ms >= self.export_min_ms:
+            self._ensure_exporter()
+            try:
+                self._export_queue.put_nowait(trace)
+            except queue.Full:
+                # Disco lento não pode segurar as requisições: o trace fica só no buffer
+                TRACES_DROPPED.inc()
+
+    def _ensure_exporter(self):
+        # Threads não sobrevivem ao fork: cada worker inicia a sua no primeiro trace
+        if self._exporter_pid != os.getpid():
+            self._export_queue = queue.Queue(maxsize=self._export_queue.maxsize)
+            self._exporter = threading.Thread(target=self._export_loop, name='trace-exporter', daemon=True)
+            self._exporter_pid = os.getpid()
+            self._exporter.start()
+
+    def _export_loop(self):
+        try:
+            f = open(self.export_path, 'ab', buffering=0)
+        except OSError as e:
+            logger.error(f"Trace export disabled, cannot open {self.export_path}: {str(e)}")
+            return
+        with f:
+            while True:
+                trace = self._export_queue.get()
+                if trace is None:
+                    return
+                batch = [trace]
+                # Esvazia o que já estiver na fila e grava tudo com um único flush
+                while len(batch) < 1000:
+                    try:
+                        batch.append(self._export_queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = None in batch
+                try:
+                    lines = ''.join(
+                        json.dumps(trace.to_dict(), ensure_ascii=False, default=str) + '\n'
+                        for trace in batch if trace is not None
+                    )
+                    # Uma escrita por lote em modo append: workers que compartilham o arquivo
+                    # não intercalam pedaços de linhas
+                    os.write(f.fileno(), lines.encode('utf-8'))
+                except (OSError, TypeError, ValueError) as e:
+                    logger.error(f"Trace export failed: {str(e)}")
+                if stop:
+                    return
+
+    def close(self, timeout: float = 5):
+        """Grava os traces ainda na fila antes de o worker sair"""
+        if self._exporter is None or self._exporter_pid != os.getpid():
+            return
+        try:
+            self._export_queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._exporter.join(timeout)
+
+    def recent(self, min_ms: float = 0, limit: int = 20) -> List[Trace]:
+        """Traces mais recentes com duração >= min_ms, do mais novo para o mais antigo"""
+        result = []
+        for trace in reversed(self.traces):
+            if trace.duration_ms >= min_ms:
+                result.append(trace)
+                if len(result) >= limit:
+                    break
+        return result
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        for trace in self.traces:
+            if trace.trace_id == trace_id:
+                return trace
+        return None
+
+class TracingMiddleware:
+    """
+    Abre um trace por requisição HTTP e decide no fim se guarda no TraceStore: requisições
+    com duração >= slow_ms sempre ficam; as rápidas entram com probabilidade sample_rate
+    """
+
+    def __init__(self, app, store: TraceStore, sample_rate: float = 1.0, slow_ms: float = 0):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+
+    def keep(self, trace: Trace) -> bool:
+        return trace.duration_ms >= self.slow_ms or random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(f"{scope['method']} {scope['path']}")
+        trace_token = _current_trace.set(trace)
+        root = trace.new_span('request', None, trace.start, {})
+        span_token = _current_span.set(root)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            trace.end = root.end = time.perf_counter()
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+            trace.name = f"{scope['method']} {route_template(scope)}"
+            root.name = trace.name
+            if self.keep(trace):
+                self.store.add(trace)
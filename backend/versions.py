@@ -0,0 +1,98 @@
+"""
+Versões de dados em db.meta
+Quem altera dados que os workers guardam em memória incrementa a versão; cada worker
+verifica periodicamente e recarrega ou invalida o que tem quando percebe a versão nova
+"""
+import asyncio
+import logging
+from typing import Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Log de mudanças guardado no próprio documento da versão (um item por incremento)
+CHANGE_LOG_SIZE = 1000
+MAX_KEYS_PER_CHANGE = 100
+
+async def fetch_version(db, version_id: str) -> int:
+    doc = await db.meta.find_one({'_id': version_id}, {'version': 1})
+    return doc['version'] if doc else 0
+
+async def bump_version(db, version_id: str) -> int:
+    doc = await db.meta.find_one_and_update(
+        {'_id': version_id},
+        {'$inc': {'version': 1}},
+        upsert=True,
+        return_document=True
+    )
+    return doc['version']
+
+async def publish_change(db, version_id: str, keys: Iterable[str]) -> int:
+    """
+    Incrementa a versão registrando quais chaves mudaram, na mesma operação atômica.
+    Mudanças com chaves demais viram None (quem lê recarrega tudo)
+    """
+    keys = list(keys)
+    entry = keys if len(keys) <= MAX_KEYS_PER_CHANGE else None
+    doc = await db.meta.find_one_and_update(
+        {'_id': version_id},
+        {'$inc': {'version': 1}, '$push': {'changes': {'$each': [entry], '$slice': -CHANGE_LOG_SIZE}}},
+        upsert=True,
+        projection={'version': 1},
+        return_document=True
+    )
+    return doc['version']
+
+async def fetch_changes(db, version_id: str, since: int) -> Tuple[int, Optional[Set[str]]]:
+    """
+    (versão atual, chaves alteradas depois de `since`). None no lugar das chaves quando
+    não dá para saber (log já descartou mudanças ou uma mudança grande demais)
+    """
+    doc = await db.meta.find_one({'_id': version_id}, {'version': 1, 'changes': {'$slice': -CHANGE_LOG_SIZE}})
+    if not doc:
+        return 0, set()
+    version = doc['version']
+    missed = version - since
+    if missed <= 0:
+        return version, set()
+    changes = doc.get('changes') or []
+    if missed > len(changes):
+        return version, None
+    keys = set()
+    for entry in changes[-missed:]:
+        if entry is None:
+            return version, None
+        keys.update(entry)
+    return version, keys
+
+async def watch_version(db, version_id: str, on_change, interval: float):
+    """Verifica a versão a cada `interval` segundos e chama on_change(version) quando muda"""
+    current = await fetch_version(db, version_id)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            version = await fetch_version(db, version_id)
+            if version != current:
+                await on_change(version)
+                current = version
+        except Exception as e:
+            logger.error(f"Version check failed for {version_id}: {str(e)}")
+
+async def watch_changes(db, version_id: str, on_keys, on_reset, interval: float):
+    """
+    Como watch_version, para versões gravadas com publish_change: chama on_keys(chaves)
+    com o que mudou, ou on_reset() quando as chaves alteradas não são conhecidas
+    """
+    current = await fetch_version(db, version_id)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            version, keys = await fetch_changes(db, version_id, current)
+            if version == current:
+                continue
+            if keys is None:
+                await on_reset()
+            else:
+                await on_keys(keys)
+            current = version
+        except Exception as e:
+            logger.error(f"Change check failed for {version_id}: {str(e)}")
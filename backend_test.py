@@ -1,4 +1,5 @@
 import requests
+import os
 import sys
 import json
 from datetime import datetime
@@ -623,7 +624,8 @@ class WatizatAPITester:
         return self.tests_passed == self.tests_run
 
 def main():
-    tester = WatizatAPITester()
+    # API_BASE_URL permite rodar contra um app local (ex: o mesmo subido por python -m loadtest.app)
+    tester = WatizatAPITester(os.environ.get('API_BASE_URL', "https://volunteer-access.preview.emergentagent.com"))
     
     try:
         # Run help categories specific tests
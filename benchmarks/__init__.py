@@ -0,0 +1,4 @@
+"""
+Micro-benchmarks dos caminhos quentes que rodam em processo a cada requisição
+Uso: python -m benchmarks [--save NOME] [--compare NOME] [--filter TEXTO]
+"""
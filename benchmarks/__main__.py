@@ -0,0 +1,103 @@
+"""
+Executa os micro-benchmarks, salva baselines e compara com execuções anteriores
+
+  python -m benchmarks --save main        # grava benchmarks/baselines/main.json
+  python -m benchmarks --compare main     # mostra a variação e falha acima de --max-regression
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.hotpaths import BENCHMARKS
+
+BASELINES_DIR = Path(__file__).parent / 'baselines'
+
+def measure(run, ops_per_call: int, repeats: int, min_time: float) -> dict:
+    """Calibra o número de chamadas para cada repetição durar pelo menos min_time"""
+    run()  # aquecimento
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            run()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed == 0 else max(2, int(min_time / elapsed * 1.2))
+
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(loops):
+            run()
+        samples.append((time.perf_counter() - started) / (loops * ops_per_call) * 1e9)
+    return {
+        'ns_per_op': min(samples),
+        'median_ns': statistics.median(samples),
+        'stdev_ns': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'loops': loops,
+    }
+
+def format_ns(value: float) -> str:
+    if value >= 1e6:
+        return f"{value / 1e6:.2f} ms"
+    if value >= 1e3:
+        return f"{value / 1e3:.2f} µs"
+    return f"{value:.0f} ns"
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description="Micro-benchmarks dos caminhos quentes")
+    parser.add_argument('--filter', default='', help="Só benchmarks cujo nome contém este texto")
+    parser.add_argument('--repeats', type=int, default=7)
+    parser.add_argument('--min-time', type=float, default=0.2, help="Segundos mínimos por repetição")
+    parser.add_argument('--save', metavar='NAME', help="Salva o resultado como baseline")
+    parser.add_argument('--compare', metavar='NAME', help="Compara com um baseline salvo")
+    parser.add_argument('--max-regression', type=float, default=0.10, help="Variação máxima aceita (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads((BASELINES_DIR / f"{args.compare}.json").read_text())['results']
+
+    results = {}
+    regressions = []
+    print(f"{'benchmark':<36}{'per op':>12}{'median':>12}{'baseline':>12}{'change':>10}")
+    for name, setup in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        run, ops_per_call = setup()
+        result = measure(run, ops_per_call, args.repeats, args.min_time)
+        results[name] = result
+
+        line = f"{name:<36}{format_ns(result['ns_per_op']):>12}{format_ns(result['median_ns']):>12}"
+        previous = (baseline or {}).get(name)
+        if previous:
+            change = result['ns_per_op'] / previous['ns_per_op'] - 1
+            line += f"{format_ns(previous['ns_per_op']):>12}{change:>+10.1%}"
+            if change > args.max_regression:
+                regressions.append((name, change))
+        print(line)
+
+    if args.save:
+        BASELINES_DIR.mkdir(exist_ok=True)
+        payload = {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'results': results,
+        }
+        (BASELINES_DIR / f"{args.save}.json").write_text(json.dumps(payload, indent=2))
+        print(f"\nBaseline salvo em {BASELINES_DIR / (args.save + '.json')}")
+
+    if regressions:
+        print("\n❌ Regressões acima do limite:")
+        for name, change in regressions:
+            print(f"  - {name}: {change:+.1%}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Casos de benchmark: cada função registrada recebe nada e devolve (callable, operações por chamada)
+O setup (fixtures, imports) fica fora do callable medido
+"""
+import os
+import sys
+import uuid
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+
+BENCHMARKS = {}
+
+def benchmark(name: str):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+def load_server():
+    """Importa o server sem banco nem SDK do LLM (o client do Motor só conecta no primeiro uso)"""
+    os.environ.setdefault('MONGO_URL', 'mongodb://127.0.0.1:27017')
+    os.environ.setdefault('DB_NAME', 'benchmarks')
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+    from loadtest.app import install_fake_llm
+    install_fake_llm()
+    import server
+    return server
+
+def user_doc(index: int, role: str = 'volunteer') -> dict:
+    return {
+        'id': str(uuid.UUID(int=index)),
+        'email': f'user{index}@example.org',
+        'name': f'Usuário {index}',
+        'display_name': None,
+        'use_display_name': False,
+        'role': role,
+        'location': {'lat': 48.85, 'lng': 2.35},
+        'bio': None,
+        'languages': ['pt', 'fr'],
+        'categories': [],
+        'created_at': datetime(2025, 1, 1, tzinfo=timezone.utc).isoformat(),
+        'password': '$2b$12$abcdefghijklmnopqrstuv',
+        'help_categories': ['food', 'legal'],
+    }
+
+def post_docs(count: int) -> list:
+    categories = ['food', 'legal', 'health', 'housing', 'work']
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            'id': str(uuid.UUID(int=10_000 + i)),
+            'user_id': str(uuid.UUID(int=i % 20)),
+            'type': 'need' if i % 3 else 'offer',
+            'category': categories[i % len(categories)],
+            'title': f'Post {i}',
+            'description': 'Preciso de ajuda com documentos e moradia em Paris. ' * 3,
+            'location': None,
+            'images': [],
+            'created_at': (start + timedelta(minutes=i)).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+@benchmark('pdf_processor.search')
+def bench_pdf_search():
+    sys.path.insert(0, str(BACKEND_DIR))
+    from pdf_processor import WatizatPDFProcessor
+    processor = WatizatPDFProcessor()
+    queries = ['Onde posso comer?', 'Preciso de advogado para asilo', 'hospital perto', 'Quero estudar francês',
+               'Como achar emprego e moradia?', 'Olá, bom dia']
+
+    def run():
+        for query in queries:
+            processor.search(query, k=3)
+    return run, len(queries)
+
+@benchmark('auto_responses.get_auto_response')
+def bench_auto_response():
+    sys.path.insert(0, str(BACKEND_DIR))
+    from auto_responses import get_auto_response
+    categories = ['food', 'legal', 'health', 'housing', 'work', 'education', 'social', 'clothes', 'furniture', 'transport', 'other']
+
+    def run():
+        for category in categories:
+            get_auto_response(category)
+    return run, len(categories)
+
+@benchmark('jwt.decode')
+def bench_jwt_decode():
+    server = load_server()
+    token = server.create_token(str(uuid.uuid4()), 'user@example.org')
+
+    jwt = server.lazy_import('jwt')
+
+    def run():
+        jwt.decode(token, server.JWT_SECRET, algorithms=[server.ALGORITHM])
+    return run, 1
+
+@benchmark('User(**doc)')
+def bench_user_model():
+    server = load_server()
+    doc = user_doc(1)
+    doc.pop('password')
+
+    def run():
+        server.User(**doc)
+    return run, 1
+
+@benchmark('get_posts munging (100 posts)')
+def bench_feed_munging():
+    server = load_server()
+    posts = post_docs(100)
+    authors = {user['id']: user for user in (user_doc(i) for i in range(20))}
+
+    def run():
+        # Cópias rasas: prepare_feed_post altera os dicts
+        for post in posts:
+            post = dict(post)
+            server.prepare_feed_post(post, authors.get(post['user_id']), 'volunteer', ['food', 'legal'])
+    return run, len(posts)
+
+def serialization_payload(count: int) -> list:
+    # Como em get_messages/admin_get_users: created_at já convertido para datetime
+    posts = post_docs(count)
+    for post in posts:
+        post['created_at'] = datetime.fromisoformat(post['created_at'])
+        post['user'] = {'name': 'Usuário', 'role': 'migrant'}
+    return posts
+
+@benchmark('serialize 1000 items: default')
+def bench_serialize_default():
+    load_server()
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    posts = serialization_payload(1000)
+
+    def run():
+        JSONResponse(jsonable_encoder(posts))
+    return run, 1
+
+@benchmark('serialize 1000 items: orjson')
+def bench_serialize_orjson():
+    load_server()
+    from fastapi.responses import ORJSONResponse
+    posts = serialization_payload(1000)
+
+    def run():
+        ORJSONResponse(posts)
+    return run, 1
+
+@benchmark('user_from_db(doc)')
+def bench_user_from_db():
+    server = load_server()
+    doc = user_doc(1)
+    doc.pop('password')
+
+    def run():
+        server.user_from_db(dict(doc))
+    return run, 1
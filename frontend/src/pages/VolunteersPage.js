@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useContext } from 'react';
+import React, { useState, useEffect, useContext, useRef } from 'react';
 import { AuthContext } from '../App';
 import { Button } from '../components/ui/button';
 import { Input } from '../components/ui/input';
@@ -24,52 +24,60 @@ export default function VolunteersPage() {
   const { token } = useContext(AuthContext);
   const navigate = useNavigate();
   const [volunteers, setVolunteers] = useState([]);
-  const [filteredVolunteers, setFilteredVolunteers] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
+  const [debouncedSearch, setDebouncedSearch] = useState('');
   const [areaFilter, setAreaFilter] = useState('all');
+  // Respostas de filtros antigos que chegam atrasadas são descartadas
+  const requestId = useRef(0);
 
   useEffect(() => {
-    fetchVolunteers();
-  }, []);
+    const timer = setTimeout(() => setDebouncedSearch(searchTerm.trim()), 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
 
   useEffect(() => {
-    filterVolunteers();
-  }, [volunteers, searchTerm, areaFilter]);
+    // Filtro novo: a lista e o cursor recomeçam do zero no servidor
+    setVolunteers([]);
+    setNextCursor(null);
+    setLoading(true);
+    fetchVolunteers();
+  }, [areaFilter, debouncedSearch]);
 
-  const fetchVolunteers = async () => {
+  const fetchVolunteers = async (cursor = null) => {
+    const id = ++requestId.current;
+    const params = new URLSearchParams({ limit: '50' });
+    if (areaFilter !== 'all') params.set('area', areaFilter);
+    if (debouncedSearch) params.set('search', debouncedSearch);
+    if (cursor) params.set('cursor', cursor);
     try {
-      const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/volunteers`, {
+      const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/volunteers?${params}`, {
         headers: { 'Authorization': `Bearer ${token}` }
       });
-      if (response.ok) {
+      if (response.ok && id === requestId.current) {
         const data = await response.json();
-        setVolunteers(data);
+        setVolunteers(prev => cursor ? [...prev, ...data.volunteers] : data.volunteers);
+        setNextCursor(data.next_cursor);
       }
     } catch (error) {
       console.error('Error fetching volunteers:', error);
     } finally {
-      setLoading(false);
+      if (id === requestId.current) {
+        setLoading(false);
+        setLoadingMore(false);
+      }
     }
   };
 
-  const filterVolunteers = () => {
-    let filtered = volunteers;
-
-    if (areaFilter !== 'all') {
-      filtered = filtered.filter(v => v.professional_area === areaFilter);
-    }
-
-    if (searchTerm) {
-      filtered = filtered.filter(v => 
-        v.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        v.professional_specialties?.some(s => s.toLowerCase().includes(searchTerm.toLowerCase()))
-      );
-    }
-
-    setFilteredVolunteers(filtered);
+  const loadMoreVolunteers = () => {
+    setLoadingMore(true);
+    fetchVolunteers(nextCursor);
   };
 
+  const hasFilters = areaFilter !== 'all' || debouncedSearch !== '';
+
   const getAreaInfo = (area) => {
     return PROFESSIONAL_AREAS.find(a => a.value === area) || { icon: '👤', label: area };
   };
@@ -139,18 +147,18 @@ export default function VolunteersPage() {
       <div className="container mx-auto px-4 py-6 max-w-4xl">
         {loading ? (
           <div className="text-center py-12 text-textMuted">Carregando voluntários...</div>
-        ) : filteredVolunteers.length === 0 ? (
+        ) : volunteers.length === 0 ? (
           <div className="text-center py-12">
             <div className="text-6xl mb-4">🔍</div>
             <p className="text-textMuted text-lg">
-              {volunteers.length === 0 
-                ? 'Nenhum voluntário cadastrado ainda' 
-                : 'Nenhum voluntário encontrado com esses filtros'}
+              {hasFilters
+                ? 'Nenhum voluntário encontrado com esses filtros'
+                : 'Nenhum voluntário cadastrado ainda'}
             </p>
           </div>
         ) : (
           <div className="grid grid-cols-1 md:grid-cols-2 gap-4">
-            {filteredVolunteers.map((volunteer) => {
+            {volunteers.map((volunteer) => {
               const areaInfo = getAreaInfo(volunteer.professional_area);
               return (
                 <div 
@@ -275,6 +283,20 @@ export default function VolunteersPage() {
           </div>
         )}
 
+        {!loading && nextCursor && (
+          <div className="text-center mt-6">
+            <Button
+              data-testid="load-more-volunteers"
+              onClick={loadMoreVolunteers}
+              disabled={loadingMore}
+              variant="outline"
+              className="rounded-full px-6"
+            >
+              {loadingMore ? 'Carregando...' : 'Carregar mais'}
+            </Button>
+          </div>
+        )}
+
         {/* Call to Action */}
         <div className="mt-8 bg-gradient-to-br from-blue-50 to-indigo-50 rounded-3xl p-8 text-center border-2 border-primary/20">
           <h3 className="text-2xl font-heading font-bold text-textPrimary mb-3">
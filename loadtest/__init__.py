@@ -0,0 +1,5 @@
+"""
+Testes de carga locais da API Watizat
+Sobe um mongod e o app localmente, roda cenários ponderados em paralelo e reporta
+throughput e latências p50/p95/p99 por endpoint. Uso: python -m loadtest --help
+"""
@@ -0,0 +1,333 @@
+"""
+Harness de carga assíncrono: python -m loadtest --duration 60 --concurrency 50 --start-mongod
+
+Sobe (opcionalmente) um mongod local e o app com LLM falso, cria uma base inicial via API,
+roda cenários ponderados com N usuários virtuais e reporta throughput e p50/p95/p99 por
+endpoint. Sai com código 1 se algum limite de thresholds.json (ou do baseline) for violado.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import httpx
+from pymongo import MongoClient
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+CATEGORIES = ['food', 'legal', 'health', 'housing', 'work', 'education', 'social', 'clothes', 'furniture', 'transport']
+QUESTIONS = ['Onde posso comer de graça?', 'Preciso de um advogado para asilo', 'Como encontrar abrigo hoje?',
+             'Onde tem curso de francês?', 'Como marcar consulta médica sem documentos?']
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.statuses = defaultdict(Counter)
+
+    def add(self, label: str, seconds: float, status: int, ok: bool):
+        self.latencies[label].append(seconds * 1000)
+        self.statuses[label][status] += 1
+        if not ok:
+            self.errors[label] += 1
+
+class Session:
+    """Estado compartilhado pelos usuários virtuais (tokens, ids de posts...)"""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.migrants = []
+        self.volunteers = []
+        self.admin = None
+        self.post_ids = []
+
+    async def call(self, method: str, label: str, url: str, token: str = None, expected=(200,), **kwargs):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=headers, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, 0
+        self.recorder.add(label, time.perf_counter() - started, status, status in expected)
+        return response
+
+    async def register(self, role: str, **extra) -> dict:
+        email = f"lt-{uuid.uuid4().hex[:12]}@loadtest.local"
+        payload = {'email': email, 'password': 'loadtest123', 'name': f"Load {role}", 'role': role,
+                   'languages': self.rng.sample(['pt', 'fr', 'en', 'ar'], 2), **extra}
+        response = await self.call('POST', 'POST /api/auth/register', '/api/auth/register', json=payload)
+        if response is None or response.status_code != 200:
+            return None
+        data = response.json()
+        return {'token': data['token'], 'id': data['user']['id'], 'email': email, 'role': role}
+
+async def setup(session: Session, args, mongo_url: str, db_name: str):
+    """Base inicial pela própria API; o admin é promovido direto no banco"""
+    for _ in range(args.seed_migrants):
+        user = await session.register('migrant', need_categories=session.rng.sample(CATEGORIES, 2))
+        if user:
+            session.migrants.append(user)
+    for _ in range(args.seed_volunteers):
+        user = await session.register('volunteer', help_categories=session.rng.sample(CATEGORIES, 3),
+                                      availability='Fins de semana', professional_area='legal')
+        if user:
+            session.volunteers.append(user)
+    session.admin = await session.register('migrant')
+    if not session.migrants or not session.volunteers or not session.admin:
+        raise RuntimeError("Could not register seed users")
+    with MongoClient(mongo_url) as mongo:
+        mongo[db_name].users.update_one({'id': session.admin['id']}, {'$set': {'role': 'admin'}})
+
+    for user in session.migrants + session.volunteers:
+        for _ in range(args.seed_posts_per_user):
+            post_type = 'need' if user['role'] == 'migrant' else 'offer'
+            response = await session.call('POST', 'POST /api/posts', '/api/posts', user['token'], json={
+                'type': post_type, 'category': session.rng.choice(CATEGORIES),
+                'title': 'Post de carga', 'description': 'Descrição gerada pelo teste de carga'
+            })
+            if response is not None and response.status_code == 200:
+                session.post_ids.append(response.json()['id'])
+    for migrant in session.migrants:
+        volunteer = session.rng.choice(session.volunteers)
+        for i in range(args.seed_messages_per_pair):
+            sender, receiver = (migrant, volunteer) if i % 2 == 0 else (volunteer, migrant)
+            await session.call('POST', 'POST /api/messages', '/api/messages', sender['token'],
+                               json={'to_user_id': receiver['id'], 'message': f'Mensagem {i}'})
+
+# --- Cenários ---------------------------------------------------------------------------
+
+async def feed_browsing(session: Session):
+    user = session.rng.choice(session.migrants + session.volunteers)
+    await session.call('GET', 'GET /api/posts', '/api/posts', user['token'])
+    await session.call('GET', 'GET /api/posts?category', '/api/posts', user['token'],
+                       params={'category': session.rng.choice(CATEGORIES)})
+    if session.post_ids:
+        post_id = session.rng.choice(session.post_ids)
+        await session.call('GET', 'GET /api/posts/{id}/comments', f'/api/posts/{post_id}/comments', user['token'])
+    await session.call('GET', 'GET /api/services', '/api/services', user['token'])
+
+async def chat_polling(session: Session):
+    migrant = session.rng.choice(session.migrants)
+    volunteer = session.rng.choice(session.volunteers)
+    await session.call('GET', 'GET /api/conversations', '/api/conversations', volunteer['token'])
+    await session.call('GET', 'GET /api/can-chat/{id}', f"/api/can-chat/{migrant['id']}", volunteer['token'])
+    # DirectChatPage consulta as mensagens a cada 3s enquanto o chat está aberto
+    for _ in range(3):
+        await session.call('GET', 'GET /api/messages/{id}', f"/api/messages/{volunteer['id']}", migrant['token'])
+    await session.call('POST', 'POST /api/messages', '/api/messages', migrant['token'],
+                       json={'to_user_id': volunteer['id'], 'message': 'Olá, ainda precisa de ajuda?'})
+
+async def ai_chat(session: Session):
+    migrant = session.rng.choice(session.migrants)
+    await session.call('POST', 'POST /api/ai/chat', '/api/ai/chat', migrant['token'],
+                       json={'message': session.rng.choice(QUESTIONS), 'language': 'pt'})
+
+async def admin_dashboard(session: Session):
+    token = session.admin['token']
+    await session.call('GET', 'GET /api/admin/stats', '/api/admin/stats', token)
+    await session.call('GET', 'GET /api/admin/users', '/api/admin/users', token)
+    await session.call('GET', 'GET /api/admin/posts', '/api/admin/posts', token)
+
+async def registration_burst(session: Session):
+    users = await asyncio.gather(*(session.register('migrant') for _ in range(5)))
+    for user in users:
+        if user:
+            await session.call('POST', 'POST /api/auth/login', '/api/auth/login',
+                               json={'email': user['email'], 'password': 'loadtest123'})
+
+SCENARIOS = {
+    'feed_browsing': (feed_browsing, 40),
+    'chat_polling': (chat_polling, 30),
+    'ai_chat': (ai_chat, 10),
+    'admin_dashboard': (admin_dashboard, 5),
+    'registration_burst': (registration_burst, 15),
+}
+
+def parse_weights(spec: str) -> dict:
+    weights = {name: weight for name, (_, weight) in SCENARIOS.items()}
+    for item in filter(None, (spec or '').split(',')):
+        name, _, value = item.partition('=')
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario: {name}")
+        weights[name] = float(value)
+    return weights
+
+async def virtual_user(session: Session, weights: dict, deadline: float):
+    names = list(weights)
+    cum = [weights[name] for name in names]
+    while time.perf_counter() < deadline:
+        name = session.rng.choices(names, weights=cum)[0]
+        await SCENARIOS[name][0](session)
+
+# --- Relatório e limites ----------------------------------------------------------------
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    endpoints = {}
+    total = 0
+    for label, values in sorted(recorder.latencies.items()):
+        values = sorted(values)
+        total += len(values)
+        endpoints[label] = {
+            'count': len(values),
+            'errors': recorder.errors[label],
+            'error_rate': recorder.errors[label] / len(values),
+            'rps': len(values) / elapsed,
+            'p50_ms': percentile(values, 50),
+            'p95_ms': percentile(values, 95),
+            'p99_ms': percentile(values, 99),
+            'statuses': dict(recorder.statuses[label]),
+        }
+    return {'elapsed_s': elapsed, 'requests': total, 'throughput_rps': total / elapsed, 'endpoints': endpoints}
+
+def print_report(summary: dict):
+    header = f"{'endpoint':<34}{'count':>8}{'err%':>7}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}"
+    print(header)
+    print('-' * len(header))
+    for label, row in summary['endpoints'].items():
+        print(f"{label:<34}{row['count']:>8}{row['error_rate'] * 100:>6.1f}%{row['rps']:>9.1f}"
+              f"{row['p50_ms']:>8.1f}ms{row['p95_ms']:>7.1f}ms{row['p99_ms']:>7.1f}ms")
+    print('-' * len(header))
+    print(f"{summary['requests']} requisições em {summary['elapsed_s']:.1f}s = {summary['throughput_rps']:.1f} req/s")
+
+def check(summary: dict, thresholds: dict, baseline: dict = None) -> list:
+    failures = []
+    if summary['throughput_rps'] < thresholds.get('min_throughput_rps', 0):
+        failures.append(f"throughput {summary['throughput_rps']:.1f} req/s < {thresholds['min_throughput_rps']}")
+    for label, row in summary['endpoints'].items():
+        limits = {**thresholds.get('default', {}), **thresholds.get('endpoints', {}).get(label, {})}
+        for key in ('p95_ms', 'p99_ms', 'error_rate'):
+            if key in limits and row[key] > limits[key]:
+                failures.append(f"{label}: {key} {row[key]:.3f} > {limits[key]}")
+        previous = (baseline or {}).get('endpoints', {}).get(label)
+        max_regression = thresholds.get('max_p95_regression')
+        if previous and max_regression is not None and previous['p95_ms'] > 0:
+            change = row['p95_ms'] / previous['p95_ms'] - 1
+            if change > max_regression:
+                failures.append(f"{label}: p95 {previous['p95_ms']:.1f}ms -> {row['p95_ms']:.1f}ms (+{change:.0%})")
+    return failures
+
+# --- Processos locais (mongod e app) ----------------------------------------------------
+
+def wait_for(predicate, timeout: float, what: str):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if predicate():
+                return
+        except Exception:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {what}")
+
+def start_mongod(port: int):
+    binary = shutil.which('mongod')
+    if not binary:
+        raise SystemExit("mongod not found in PATH")
+    dbpath = tempfile.mkdtemp(prefix='loadtest-mongo-')
+    process = subprocess.Popen([binary, '--dbpath', dbpath, '--port', str(port), '--bind_ip', '127.0.0.1', '--quiet'],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'mongodb://127.0.0.1:{port}'
+    wait_for(lambda: MongoClient(url, serverSelectionTimeoutMS=500).admin.command('ping'), 30, 'mongod')
+    return process, dbpath, url
+
+def start_app(port: int, mongo_url: str, db_name: str):
+    env = {**os.environ, 'MONGO_URL': mongo_url, 'DB_NAME': db_name, 'JWT_SECRET': 'loadtest-secret'}
+    process = subprocess.Popen([sys.executable, '-m', 'loadtest.app', '--port', str(port)], cwd=ROOT_DIR, env=env)
+    base_url = f'http://127.0.0.1:{port}'
+    wait_for(lambda: httpx.get(f'{base_url}/api/', timeout=1).status_code == 200, 60, 'app')
+    return process, base_url
+
+async def run(args, base_url: str, mongo_url: str, db_name: str) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        session = Session(client, Recorder(), random.Random(args.seed))
+        await setup(session, args, mongo_url, db_name)
+        # Medir só a fase de carga, não a criação da base inicial
+        session.recorder = Recorder()
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(virtual_user(session, parse_weights(args.weights), deadline) for _ in range(args.concurrency)))
+        return summarize(session.recorder, time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m loadtest', description="Teste de carga local da API")
+    parser.add_argument('--duration', type=float, default=30, help="Segundos de carga")
+    parser.add_argument('--concurrency', type=int, default=20, help="Usuários virtuais simultâneos")
+    parser.add_argument('--weights', default='', help="Ex: feed_browsing=50,ai_chat=5")
+    parser.add_argument('--start-mongod', action='store_true', help="Sobe um mongod temporário")
+    parser.add_argument('--mongo-port', type=int, default=27217)
+    parser.add_argument('--mongo-url', default=os.environ.get('MONGO_URL', 'mongodb://127.0.0.1:27017'))
+    parser.add_argument('--app-port', type=int, default=8765)
+    parser.add_argument('--base-url', help="Usar um app já rodando em vez de subir um")
+    parser.add_argument('--db-name', default=f"loadtest_{int(time.time())}")
+    parser.add_argument('--keep-db', action='store_true')
+    parser.add_argument('--seed-migrants', type=int, default=30)
+    parser.add_argument('--seed-volunteers', type=int, default=20)
+    parser.add_argument('--seed-posts-per-user', type=int, default=3)
+    parser.add_argument('--seed-messages-per-pair', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--thresholds', type=Path, default=Path(__file__).parent / 'thresholds.json')
+    parser.add_argument('--baseline', type=Path, help="Resultado anterior para comparar p95")
+    parser.add_argument('--output', type=Path, help="Salva o resultado em JSON (pode virar baseline)")
+    args = parser.parse_args()
+
+    processes = []
+    dbpath = None
+    mongo_url = args.mongo_url
+    try:
+        if args.start_mongod:
+            mongod, dbpath, mongo_url = start_mongod(args.mongo_port)
+            processes.append(mongod)
+        base_url = args.base_url
+        if not base_url:
+            app, base_url = start_app(args.app_port, mongo_url, args.db_name)
+            processes.append(app)
+
+        summary = asyncio.run(run(args, base_url, mongo_url, args.db_name))
+    finally:
+        if not args.keep_db and not args.base_url:
+            try:
+                with MongoClient(mongo_url, serverSelectionTimeoutMS=2000) as mongo:
+                    mongo.drop_database(args.db_name)
+            except Exception:
+                pass
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=30)
+        if dbpath:
+            shutil.rmtree(dbpath, ignore_errors=True)
+
+    print_report(summary)
+    if args.output:
+        args.output.write_text(json.dumps(summary, indent=2))
+
+    thresholds = json.loads(args.thresholds.read_text())
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    failures = check(summary, thresholds, baseline)
+    if failures:
+        print("\n❌ Limites violados:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\n✅ Todos os limites respeitados")
+
+if __name__ == "__main__":
+    main()
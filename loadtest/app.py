@@ -0,0 +1,65 @@
+"""
+Sobe o app FastAPI para os testes de carga com um LLM falso no lugar do emergentintegrations
+Uso: python -m loadtest.app --port 8765 (MONGO_URL e DB_NAME vêm do ambiente)
+"""
+import argparse
+import asyncio
+import os
+import sys
+import types
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+
+FAKE_LLM_LATENCY = float(os.environ.get('FAKE_LLM_LATENCY', '0.2'))
+
+class FakeUserMessage:
+    def __init__(self, text: str):
+        self.text = text
+
+class FakeLlmChat:
+    """Mesma interface usada em server.ai_chat, com latência fixa e resposta canned"""
+
+    def __init__(self, api_key: str, session_id: str, system_message: str):
+        self.session_id = session_id
+        self.system_message = system_message
+
+    def with_model(self, provider: str, model: str):
+        return self
+
+    async def send_message(self, message) -> str:
+        await asyncio.sleep(FAKE_LLM_LATENCY)
+        return f"Resposta de teste para: {message.text[:80]}"
+
+def install_fake_llm():
+    """Registra o módulo falso antes do server importar o SDK real"""
+    package = types.ModuleType('emergentintegrations')
+    llm = types.ModuleType('emergentintegrations.llm')
+    chat = types.ModuleType('emergentintegrations.llm.chat')
+    chat.LlmChat = FakeLlmChat
+    chat.UserMessage = FakeUserMessage
+    package.llm = llm
+    llm.chat = chat
+    sys.modules.update({
+        'emergentintegrations': package,
+        'emergentintegrations.llm': llm,
+        'emergentintegrations.llm.chat': chat,
+    })
+
+def main():
+    parser = argparse.ArgumentParser(description="App para testes de carga")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    install_fake_llm()
+    os.environ.setdefault('EMERGENT_LLM_KEY', 'loadtest')
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    import uvicorn
+    import server
+
+    uvicorn.run(server.app, host=args.host, port=args.port, log_level='warning', access_log=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+import cache as cache_module
+from cache import Cache, LocalSharedBackend, MemoryBackend
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, 'monotonic', clock)
+    return clock
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_entries_expire_after_ttl(clock):
+    namespace = Cache(MemoryBackend()).namespace('test', ttl=10)
+
+    async def scenario():
+        await namespace.set('a', 1)
+        clock.now += 9
+        before = await namespace.get('a')
+        clock.now += 2
+        after = await namespace.get('a')
+        return before, after
+
+    assert run(scenario()) == ((True, 1), (False, None))
+
+def test_least_recently_used_entry_is_evicted(clock):
+    namespace = Cache(MemoryBackend()).namespace('test', ttl=60, max_size=2)
+
+    async def scenario():
+        await namespace.set('a', 1)
+        await namespace.set('b', 2)
+        await namespace.get('a')
+        await namespace.set('c', 3)
+        return [await namespace.get(key) for key in ('a', 'b', 'c')]
+
+    assert run(scenario()) == [(True, 1), (False, None), (True, 3)]
+
+def test_concurrent_misses_share_one_load():
+    namespace = Cache(MemoryBackend()).namespace('test', ttl=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {'value': len(calls)}
+
+    async def scenario():
+        results = await asyncio.gather(*(namespace.get_or_load('a', loader) for _ in range(10)))
+        cached = await namespace.get_or_load('a', loader)
+        return results, cached
+
+    results, cached = run(scenario())
+    assert calls == [1]
+    assert all(result == {'value': 1} for result in results)
+    assert cached == {'value': 1}
+
+def test_failed_load_is_shared_but_not_cached():
+    namespace = Cache(MemoryBackend()).namespace('test', ttl=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0)
+        if len(calls) == 1:
+            raise RuntimeError('database down')
+        return 'ok'
+
+    async def scenario():
+        results = await asyncio.gather(namespace.get_or_load('a', loader), namespace.get_or_load('a', loader),
+                                       return_exceptions=True)
+        return results, await namespace.get_or_load('a', loader)
+
+    results, retried = run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert retried == 'ok'
+    assert len(calls) == 2
+
+def test_cancelled_owner_does_not_cancel_waiters():
+    namespace = Cache(MemoryBackend()).namespace('test', ttl=60)
+    release = None
+
+    async def loader():
+        await release.wait()
+        return 'value'
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        owner = asyncio.ensure_future(namespace.get_or_load('a', loader))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(namespace.get_or_load('a', loader))
+        await asyncio.sleep(0)
+        owner.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return await waiter, owner.cancelled(), await namespace.get('a')
+
+    assert run(scenario()) == ('value', True, (True, 'value'))
+
+@pytest.mark.parametrize('backend_class', [MemoryBackend, LocalSharedBackend])
+def test_invalidate_tags_removes_only_tagged_entries(backend_class):
+    namespace = Cache(backend_class()).namespace('test', ttl=60)
+
+    async def scenario():
+        await namespace.set('need:food', [1], tags=['need', 'food'])
+        await namespace.set('offer:food', [2], tags=['offer', 'food'])
+        await namespace.set('need:legal', [3], tags=['need', 'legal'])
+        await namespace.invalidate_tags('food')
+        return [await namespace.get(key) for key in ('need:food', 'offer:food', 'need:legal')]
+
+    assert run(scenario()) == [(False, None), (False, None), (True, [3])]
+
+def test_local_shared_backend_returns_copies():
+    namespace = Cache(LocalSharedBackend()).namespace('test', ttl=60)
+
+    async def scenario():
+        value = {'items': [1]}
+        await namespace.set('a', value)
+        value['items'].append(2)
+        _, cached = await namespace.get('a')
+        return cached
+
+    assert run(scenario()) == {'items': [1]}
@@ -0,0 +1,100 @@
+import asyncio
+import random
+
+from chat_permissions import CATEGORIES, ChatPermissionIndex
+
+def list_can_chat(current: dict, other: dict, posts: list) -> dict:
+    """Regra original de can_chat_with_user, com listas"""
+    if current['role'] == 'migrant':
+        return {'can_chat': True, 'reason': 'allowed'}
+    if current['role'] in ['volunteer', 'helper'] and other.get('role') == 'migrant':
+        helper_categories = current.get('help_categories', [])
+        if not helper_categories:
+            return {'can_chat': True, 'reason': 'no_categories_defined'}
+        migrant_need_categories = other.get('need_categories', [])
+        if migrant_need_categories:
+            for cat in migrant_need_categories:
+                if cat in helper_categories:
+                    return {'can_chat': True, 'reason': 'category_match', 'matching_category': cat}
+        if not posts and not migrant_need_categories:
+            return {'can_chat': True, 'reason': 'no_needs_defined'}
+        for post in posts:
+            if post.get('category') in helper_categories:
+                return {'can_chat': True, 'reason': 'category_match', 'matching_category': post.get('category')}
+        return {'can_chat': False, 'reason': 'no_matching_categories'}
+    return {'can_chat': True, 'reason': 'allowed'}
+
+def random_categories(rng):
+    return rng.sample(CATEGORIES, rng.randint(0, 4))
+
+def random_user(rng, user_id):
+    doc = {'id': user_id, 'role': rng.choice(['migrant', 'volunteer', 'helper', 'admin'])}
+    if rng.random() < 0.8:
+        doc['help_categories'] = random_categories(rng)
+    if rng.random() < 0.8:
+        doc['need_categories'] = random_categories(rng)
+    return doc
+
+def random_posts(rng):
+    return [{'category': rng.choice(CATEGORIES + [None])} for _ in range(rng.randint(0, 5))]
+
+def test_bitmask_matches_list_intersection():
+    rng = random.Random(1234)
+    for case in range(5000):
+        current, other = random_user(rng, 'a'), random_user(rng, 'b')
+        posts = random_posts(rng)
+        index = ChatPermissionIndex()
+        index.upsert_user(current)
+        index.upsert_user(other)
+        for post in posts:
+            index.add_need_post('b', post['category'])
+
+        result = index.can_chat('a', index.users['a'], 'b', index.users['b'])
+        assert result == list_can_chat(current, other, posts), (case, current, other, posts)
+
+def test_removed_post_keeps_order_of_remaining_posts():
+    index = ChatPermissionIndex()
+    index.upsert_user({'id': 'v', 'role': 'volunteer', 'help_categories': ['food', 'legal']})
+    index.upsert_user({'id': 'm', 'role': 'migrant'})
+    index.add_need_post('m', 'legal')
+    index.add_need_post('m', 'food')
+    index.remove_need_post('m', 'legal')
+    index.add_need_post('m', 'legal')
+
+    # Posts restantes no banco: food, legal
+    result = index.can_chat('v', index.users['v'], 'm', index.users['m'])
+    assert result == {'can_chat': True, 'reason': 'category_match', 'matching_category': 'food'}
+
+def test_unknown_categories_do_not_get_bits():
+    index = ChatPermissionIndex()
+    for n in range(100):
+        index.upsert_user({'id': f'u{n}', 'role': 'helper', 'help_categories': [f'custom-{n}']})
+
+    assert len(index.categories.bits) == len(CATEGORIES)
+    # Lista preenchida conta como categorias definidas, mesmo sem nenhuma conhecida
+    index.upsert_user({'id': 'm', 'role': 'migrant', 'need_categories': ['food']})
+    result = index.can_chat('u1', index.users['u1'], 'm', index.users['m'])
+    assert result == {'can_chat': False, 'reason': 'no_matching_categories'}
+
+class FakeMeta:
+    def __init__(self, doc):
+        self.doc = doc
+
+    async def find_one(self, query, projection=None):
+        return self.doc
+
+class FakeDb:
+    def __init__(self, doc):
+        self.meta = FakeMeta(doc)
+
+def test_sync_drops_only_changed_users():
+    index = ChatPermissionIndex()
+    for user_id in ('a', 'b', 'c'):
+        index.upsert_user({'id': user_id, 'role': 'helper'})
+    index.version = 1
+    db = FakeDb({'_id': 'chat_permissions_version', 'version': 3, 'changes': [['c'], ['a'], ['b']]})
+
+    asyncio.run(index.sync(db))
+
+    assert set(index.users) == {'c'}
+    assert index.version == 3
@@ -0,0 +1,68 @@
+import asyncio
+
+from cache import Cache, MemoryBackend
+from feed_cache import FeedCache
+
+class FakeMeta:
+    def __init__(self):
+        self.version = 0
+
+    async def find_one_and_update(self, query, update, **kwargs):
+        self.version += 1
+        return {'_id': query['_id'], 'version': self.version}
+
+class FakeDb:
+    def __init__(self):
+        self.meta = FakeMeta()
+
+def test_render_started_before_invalidation_is_not_cached():
+    feed = FeedCache(Cache(MemoryBackend()).namespace('feed', ttl=300))
+    db = FakeDb()
+    renders = []
+
+    async def scenario():
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_render():
+            renders.append('stale')
+            started.set()
+            await release.wait()
+            return b'stale'
+
+        async def fresh_render():
+            renders.append('fresh')
+            return b'fresh'
+
+        first = asyncio.ensure_future(feed.get_page('need', 'food', 'all', slow_render))
+        await started.wait()
+        await feed.posts_changed(db, [('need', 'food')])
+        # Leitor novo não se junta à render antiga
+        second = await feed.get_page('need', 'food', 'all', fresh_render)
+        release.set()
+        stale = await first
+        third = await feed.get_page('need', 'food', 'all', slow_render)
+        return stale, second, third
+
+    assert asyncio.run(scenario()) == (b'stale', b'fresh', b'fresh')
+    assert renders == ['stale', 'fresh']
+
+def test_invalidation_keeps_unrelated_loads():
+    feed = FeedCache(Cache(MemoryBackend()).namespace('feed', ttl=300))
+    db = FakeDb()
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def render():
+            await release.wait()
+            return b'offer page'
+
+        load = asyncio.ensure_future(feed.get_page('offer', 'legal', 'all', render))
+        await asyncio.sleep(0)
+        await feed.posts_changed(db, [('need', 'food')])
+        release.set()
+        await load
+        return await feed.namespace.get('offer|legal|all')
+
+    assert asyncio.run(scenario()) == (True, b'offer page')
@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+from generate_dataset import insert_batches
+
+class FakeCollection:
+    def __init__(self, fail_on_batch=None):
+        self.batches = []
+        self.fail_on_batch = fail_on_batch
+
+    async def insert_many(self, batch, ordered=True):
+        await asyncio.sleep(0)
+        self.batches.append(batch)
+        if len(self.batches) == self.fail_on_batch:
+            raise RuntimeError('insert failed')
+
+def test_insert_batches_counts_every_document():
+    collection = FakeCollection()
+    docs = ({'id': str(n)} for n in range(25))
+
+    inserted = asyncio.run(insert_batches(collection, docs, batch_size=10, concurrency=2))
+
+    assert inserted == 25
+    assert [len(batch) for batch in collection.batches] == [10, 10, 5]
+
+def test_insert_batches_raises_failures_of_finished_batches():
+    collection = FakeCollection(fail_on_batch=1)
+    docs = ({'id': str(n)} for n in range(100))
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(insert_batches(collection, docs, batch_size=10, concurrency=2))
+    # Para no primeiro lote que falhou em vez de gerar o resto
+    assert len(collection.batches) < 10
@@ -0,0 +1,29 @@
+import io
+import json
+
+import pytest
+
+from import_services import iter_json_array, normalize_record
+
+def test_json_array_is_read_across_chunk_boundaries():
+    records = [{'name': f'Serviço {n}', 'address': '9-11 Rue Froissart, 75003 Paris', 'lat': 48.86 + n}
+               for n in range(50)] + [12345, 'texto, com ] e [', None]
+    text = json.dumps(records, ensure_ascii=False, indent=2)
+
+    for chunk_size in (1, 7, 64, 1 << 20):
+        assert list(iter_json_array(io.StringIO(text), chunk_size)) == records
+
+@pytest.mark.parametrize('text', ['{"name": "x"}', '[{"name": "x"}', '[{"name": '])
+def test_invalid_json_array_raises(text):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(text), 4))
+
+def test_services_at_same_address_keep_separate_keys():
+    address = '9-11 Rue Froissart ,75003  Paris'
+    food_bank = normalize_record({'name': 'Restos du Coeur', 'category': 'Food', 'address': address})
+    canteen = normalize_record({'name': 'Cantine solidaire', 'category': 'food', 'address': address})
+    same = normalize_record({'name': 'RESTOS DU COEUR ', 'category': 'food', 'address': '9-11 rue Froissart, 75003 Paris'})
+
+    assert food_bank['natural_key'] != canteen['natural_key']
+    assert food_bank['natural_key'] == 'food|restos du coeur|9 11 rue froissart 75003 paris'
+    assert same['natural_key'] == food_bank['natural_key']
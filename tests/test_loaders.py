@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from loaders import BatchLoader
+
+class FakeSource:
+    def __init__(self, docs, fail=False):
+        self.docs = docs
+        self.fail = fail
+        self.calls = []
+
+    async def batch_fn(self, keys):
+        self.calls.append(list(keys))
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError('database down')
+        return {key: self.docs[key] for key in keys if key in self.docs}
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_loads_in_the_same_tick_share_one_batch():
+    source = FakeSource({'a': 1, 'b': 2, 'c': 3})
+
+    async def scenario():
+        loader = BatchLoader(source.batch_fn)
+        return await asyncio.gather(loader.load('a'), loader.load('b'), loader.load('missing'))
+
+    assert run(scenario()) == [1, 2, None]
+    assert source.calls == [['a', 'b', 'missing']]
+
+def test_batches_respect_max_batch_size():
+    source = FakeSource({n: n for n in range(5)})
+
+    async def scenario():
+        loader = BatchLoader(source.batch_fn, max_batch_size=2)
+        return await loader.load_many(range(5))
+
+    assert run(scenario()) == [0, 1, 2, 3, 4]
+    assert source.calls == [[0, 1], [2, 3], [4]]
+
+def test_loaded_values_are_memoized():
+    source = FakeSource({'a': 1})
+
+    async def scenario():
+        loader = BatchLoader(source.batch_fn)
+        first = await loader.load('a')
+        second = await asyncio.gather(loader.load('a'), loader.load('a'))
+        return first, second
+
+    assert run(scenario()) == (1, [1, 1])
+    assert source.calls == [['a']]
+
+def test_primed_values_skip_the_batch():
+    source = FakeSource({'a': 1})
+
+    async def scenario():
+        loader = BatchLoader(source.batch_fn)
+        loader.prime('me', {'id': 'me'})
+        loader.prime('me', {'id': 'ignored'})
+        return await loader.load_many(['me', 'a'])
+
+    assert run(scenario()) == [{'id': 'me'}, 1]
+    assert source.calls == [['a']]
+
+def test_failures_are_not_memoized():
+    source = FakeSource({'a': 1}, fail=True)
+
+    async def scenario():
+        loader = BatchLoader(source.batch_fn)
+        with pytest.raises(RuntimeError):
+            await asyncio.gather(loader.load('a'), loader.load('b'))
+        source.fail = False
+        return await loader.load('a')
+
+    assert run(scenario()) == 1
+    assert source.calls == [['a', 'b'], ['a']]
+
+def test_cancelled_caller_does_not_cancel_shared_load():
+    source = FakeSource({'a': 1})
+
+    async def scenario():
+        loader = BatchLoader(source.batch_fn)
+        cancelled = asyncio.ensure_future(loader.load('a'))
+        other = loader.load('a')
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        return await other
+
+    assert run(scenario()) == 1
@@ -0,0 +1,54 @@
+import json
+import os
+
+from metrics import Counter, Gauge, Histogram, Registry
+
+DEAD_PID = 999999999
+
+def make_registry():
+    registry = Registry()
+    requests = Counter('requests_total', 'Requisições', ['route'], registry=registry)
+    in_flight = Gauge('in_flight', 'Em andamento', registry=registry)
+    latency = Histogram('latency_seconds', 'Latência', buckets=(0.1, 1.0), registry=registry)
+    return registry, requests, in_flight, latency
+
+def test_render_all_aggregates_worker_snapshots(tmp_path):
+    registry, requests, in_flight, latency = make_registry()
+    registry.enable_multiprocess(str(tmp_path))
+    requests.inc('/a', amount=2)
+    in_flight.set(3)
+    latency.observe(0.05)
+    # Snapshot de um worker que já saiu
+    with open(tmp_path / f'metrics-{DEAD_PID}.json', 'w') as f:
+        json.dump({
+            'requests_total': [[['/a'], 5], [['/b'], 1]],
+            'in_flight': [[[], 7]],
+            'latency_seconds': [[[], [0, 1, 0, 0.5]]],
+        }, f)
+
+    lines = registry.render_all().splitlines()
+
+    assert 'requests_total{route="/a"} 7' in lines
+    assert 'requests_total{route="/b"} 1' in lines
+    # Gauge só dos workers vivos, um por worker
+    assert f'in_flight{{worker="{os.getpid()}"}} 3' in lines
+    assert not any(f'worker="{DEAD_PID}"' in line for line in lines)
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1"} 2' in lines
+    assert 'latency_seconds_count 2' in lines
+    assert 'latency_seconds_sum 0.55' in lines
+
+def test_enable_multiprocess_clears_previous_run(tmp_path):
+    (tmp_path / f'metrics-{DEAD_PID}.json').write_text('{"requests_total": [[["/a"], 5]]}')
+    registry, requests, _, _ = make_registry()
+    registry.enable_multiprocess(str(tmp_path))
+
+    assert 'requests_total{route="/a"}' not in registry.render_all()
+
+def test_render_all_without_directory_is_local():
+    registry, requests, in_flight, _ = make_registry()
+    requests.inc('/a')
+    in_flight.set(1)
+
+    assert registry.render_all() == registry.render()
+    assert 'in_flight 1' in registry.render()
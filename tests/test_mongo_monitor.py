@@ -0,0 +1,37 @@
+import threading
+
+from mongo_monitor import RequestQueryStats
+from tracing import Trace
+
+def run_in_threads(target, threads: int = 8):
+    workers = [threading.Thread(target=target) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+def test_query_stats_from_executor_threads_are_not_lost():
+    stats = RequestQueryStats()
+
+    def finish_commands():
+        for _ in range(20000):
+            stats.add('find', 0.5)
+
+    run_in_threads(finish_commands)
+
+    assert stats.count == 8 * 20000
+    assert stats.commands['find'] == 8 * 20000
+    assert stats.total_ms == 8 * 20000 * 0.5
+
+def test_spans_recorded_from_threads_get_unique_ids():
+    trace = Trace('GET /api/conversations')
+
+    def record_spans():
+        for _ in range(5000):
+            trace.new_span('mongo.find', None, 0.0, {}).end = 0.0
+
+    run_in_threads(record_spans)
+
+    ids = [span.span_id for span in trace.spans]
+    assert len(ids) == 8 * 5000
+    assert len(set(ids)) == len(ids)
@@ -0,0 +1,24 @@
+from matching import MatchingIndex
+from notifications import NotificationFanout
+
+def test_recipients_include_helpers_without_categories():
+    index = MatchingIndex()
+    index.upsert({'id': 'food', 'role': 'volunteer', 'help_categories': ['food']})
+    index.upsert({'id': 'legal', 'role': 'helper', 'help_categories': ['legal']})
+    index.upsert({'id': 'any', 'role': 'helper', 'help_categories': []})
+    index.upsert({'id': 'author', 'role': 'volunteer'})
+    fanout = NotificationFanout(index)
+
+    recipients = fanout.recipients({'id': 'p1', 'user_id': 'author', 'category': 'food'})
+
+    assert sorted(recipients) == ['any', 'food']
+
+def test_uncategorized_follows_profile_updates():
+    index = MatchingIndex()
+    index.upsert({'id': 'v', 'role': 'volunteer'})
+    assert index.uncategorized == {'v'}
+    index.upsert({'id': 'v', 'role': 'volunteer', 'help_categories': ['food']})
+    assert index.uncategorized == set()
+    index.upsert({'id': 'v', 'role': 'volunteer'})
+    index.remove('v')
+    assert index.uncategorized == set()
@@ -0,0 +1,80 @@
+import re
+
+import pytest
+
+from pagination import decode_cursor, encode_cursor, keyset_filter, with_keyset
+
+def matches(doc: dict, query: dict) -> bool:
+    """Subconjunto dos operadores do Mongo usados pelas listagens"""
+    for key, condition in query.items():
+        if key == '$and':
+            if not all(matches(doc, part) for part in condition):
+                return False
+        elif key == '$or':
+            if not any(matches(doc, part) for part in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = doc.get(key)
+            if '$lt' in condition and not value < condition['$lt']:
+                return False
+            if '$regex' in condition:
+                values = value if isinstance(value, list) else [value]
+                pattern = re.compile(condition['$regex'], re.IGNORECASE if 'i' in condition.get('$options', '') else 0)
+                if not any(isinstance(v, str) and pattern.search(v) for v in values):
+                    return False
+        elif doc.get(key) != condition:
+            return False
+    return True
+
+def paginate(docs, query_factory, limit):
+    ordered = sorted(docs, key=lambda doc: (doc['created_at'], doc['id']), reverse=True)
+    cursor, pages = None, []
+    while True:
+        query = query_factory(cursor)
+        page = [doc for doc in ordered if matches(doc, query)][:limit]
+        if not page:
+            return pages
+        pages.append(page)
+        cursor = encode_cursor(page[-1]['created_at'], page[-1]['id'])
+
+def volunteers():
+    # Vários com o mesmo created_at: o desempate é pelo id
+    return [
+        {'id': f'v{n:02d}', 'role': 'volunteer', 'created_at': f'2026-01-{n % 5 + 1:02d}',
+         'name': 'Marie Dupont' if n % 3 == 0 else f'Volunteer {n}', 'professional_specialties': []}
+        for n in range(30)
+    ]
+
+def test_cursor_round_trip():
+    cursor = encode_cursor('2026-01-01T10:00:00+00:00', 'abc')
+    assert decode_cursor(cursor) == ('2026-01-01T10:00:00+00:00', 'abc')
+
+@pytest.mark.parametrize('cursor', ['not-base64!', encode_cursor('2026-01-01', 'x')[:-3], 'WzEsMl0'])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        keyset_filter(cursor)
+
+def test_keyset_pages_cover_every_item_once():
+    docs = volunteers()
+    pages = paginate(docs, lambda cursor: with_keyset({'role': 'volunteer'}, cursor), limit=7)
+
+    ids = [doc['id'] for page in pages for doc in page]
+    assert sorted(ids) == sorted(doc['id'] for doc in docs)
+    assert len(ids) == len(set(ids))
+
+def test_cursor_keeps_the_search_filter():
+    docs = volunteers()
+
+    def query(cursor):
+        search = {'$regex': re.escape('dupont'), '$options': 'i'}
+        return with_keyset({'role': 'volunteer', '$or': [{'name': search}, {'professional_specialties': search}]}, cursor)
+
+    pages = paginate(docs, query, limit=3)
+
+    found = [doc['id'] for page in pages for doc in page]
+    assert len(pages) > 1
+    assert sorted(found) == sorted(doc['id'] for doc in docs if doc['name'] == 'Marie Dupont')
+
+def test_with_keyset_without_cursor_leaves_query_alone():
+    query = {'role': 'volunteer', '$or': [{'name': 'x'}]}
+    assert with_keyset(dict(query), None) == query
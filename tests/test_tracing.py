@@ -0,0 +1,58 @@
+import asyncio
+import json
+import time
+
+from tracing import Trace, TraceStore, TracingMiddleware
+
+def finished_trace(name: str) -> Trace:
+    trace = Trace(name)
+    trace.new_span('request', None, trace.start, {}).end = trace.end = time.perf_counter()
+    return trace
+
+def test_export_runs_in_background_and_close_flushes(tmp_path):
+    path = tmp_path / 'traces.jsonl'
+    store = TraceStore(capacity=10, export_path=str(path))
+    for n in range(25):
+        store.add(finished_trace(f'GET /{n}'))
+
+    store.close()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line['name'] for line in lines] == [f'GET /{n}' for n in range(25)]
+    # O ring buffer continua limitado à capacidade
+    assert len(store.traces) == 10
+
+def test_full_export_queue_drops_instead_of_blocking(tmp_path):
+    store = TraceStore(export_path=str(tmp_path / 'missing' / 'traces.jsonl'), export_queue_size=2)
+    started = time.perf_counter()
+    for n in range(100):
+        store.add(finished_trace(f'GET /{n}'))
+
+    assert time.perf_counter() - started < 1
+    assert len(store.traces) == 100
+
+def run_request(middleware, delay: float):
+    async def app(scope, receive, send):
+        await asyncio.sleep(delay)
+
+    middleware.app = app
+    scope = {'type': 'http', 'method': 'GET', 'path': '/api/posts'}
+    asyncio.run(middleware(scope, None, None))
+
+def test_slow_requests_are_always_kept():
+    store = TraceStore()
+    middleware = TracingMiddleware(None, store, sample_rate=0.0, slow_ms=20)
+
+    run_request(middleware, 0)
+    run_request(middleware, 0.03)
+
+    assert len(store.traces) == 1
+    assert store.traces[0].duration_ms >= 20
+
+def test_fast_requests_are_sampled():
+    store = TraceStore()
+    middleware = TracingMiddleware(None, store, sample_rate=1.0, slow_ms=10000)
+
+    run_request(middleware, 0)
+
+    assert len(store.traces) == 1